@@ -1,9 +1,14 @@
+from argparse import ArgumentParser
+from json import dumps as json_dumps
+from os import cpu_count, environ
+from sys import stderr, stdout
+
 from .__init__ import *
 from .init import init
 
 
-def main():
-    window = SpiritualWindow()
+def main(record=None):
+    window = SpiritualWindow(record=record)
     window.run()
 
 
@@ -17,7 +22,228 @@ def test():
     print(Profile.is_valid(data))
 
 
+def convert(args):
+    from .tilemap import convert_tilemap
+    convert_tilemap(args.source, args.target, args.chunk_size)
+
+
+def bench(args):
+    from .benchmark import BENCHMARKS
+    for name in args.names or BENCHMARKS:
+        print(f'== {name} ==')
+        BENCHMARKS[name]()
+
+
+def check(args):
+    from json import dump as json_dump, load as json_load
+    from .benchmark import check_game_reentry, check_serialization
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json_load(file)
+    failures, rates = check_serialization(
+        args.cases, seed=args.seed, baseline=baseline,
+        threshold=args.threshold)
+    failures += check_game_reentry()
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json_dump(rates, file, indent=2)
+    raise SystemExit(bool(failures))
+
+
+def replay(args):
+    from .replay import replay as replay_log
+    failed = False
+    for path in args.logs:
+        result = replay_log(path, SpiritualWindow)
+        failed |= not result.ok
+        print(f'{"ok" if result.ok else "MISMATCH":>8} {result.frames:>7} '
+              f'frames {result.fps:>10.0f} fps  {path}')
+        if not result.ok:
+            print(f'         expected {result.expected}, '
+                  f'got {result.position}')
+    raise SystemExit(failed)
+
+
+def profiles(args):
+    from .bulk import (
+        MODES, get_default_directory, scan_profiles, time_profiles,
+    )
+    # checked here rather than by the parser, which would import bulk
+    # every time the game starts
+    if args.mode not in MODES:
+        raise SystemExit(f'profiles: unknown mode {args.mode}, '
+                         f'expected one of {", ".join(MODES)}')
+    if args.mode != 'validate' and len(args.workers) > 1:
+        # every timed run would rewrite the profiles again
+        raise SystemExit(f'profiles {args.mode}: only validate can be timed '
+                         'with several worker counts')
+    paths = scan_profiles(args.directory or get_default_directory())
+    output = open(args.output, 'w') if args.output else stdout
+
+    def write(result):
+        output.write(json_dumps(result) + '\n')
+
+    failed = 0
+    # per-file results come from the first run, later worker counts are
+    # only timed
+    for i, workers in enumerate(args.workers):
+        elapsed, failed_run = time_profiles(
+            paths, args.mode, workers, write if i == 0 else None)
+        if i == 0:
+            failed = failed_run
+        rate = len(paths) / elapsed if elapsed else float('inf')
+        print(f'{workers:>3} workers {len(paths):>8} files '
+              f'{elapsed:>8.2f} s {rate:>10.0f} files/s', file=stderr)
+    if output is not stdout:
+        output.close()
+    raise SystemExit(failed > 0)
+
+
+def memory(args):
+    from .memory import MEMORY
+    from .profile import Profile
+    window = SpiritualWindow()
+    window.profile = Profile.new('memory')
+    window.set_state('game')
+    for _ in range(args.frames):
+        window.update(1 / 60)
+        window.draw()
+    if args.output:
+        with open(args.output, 'w') as file:
+            MEMORY.dump(file)
+    else:
+        MEMORY.dump(stdout)
+        print()
+    window.close()
+
+
+def parse_budget(text):
+    # CATEGORY=MIB, or CATEGORY=none to lift the budget
+    from .memory import CATEGORIES
+    category, _, size = text.partition('=')
+    if category not in CATEGORIES:
+        raise ValueError(f'unknown memory category {category}')
+    if size == 'none':
+        return category, None
+    return category, int(float(size) * 1024 * 1024)
+
+
+def get_tilemaps(args):
+    if args.shared:
+        from .sharedmap import SHARED_TILEMAPS
+        return SHARED_TILEMAPS
+    from .tilemap import TILEMAPS
+    return TILEMAPS
+
+
+def serve(args):
+    from asyncio import Event, run
+    from .server import Server
+
+    async def run_server():
+        server = Server(args.tick_rate, tilemaps=get_tilemaps(args))
+        port = await server.start(args.host, args.port)
+        print(f'serving on {args.host}:{port}', file=stderr)
+        await Event().wait()
+
+    run(run_server())
+
+
+def loadtest(args):
+    from asyncio import run
+    from .server import run_load
+    stats = run(run_load(args.sessions, args.clients, args.seconds,
+                         args.tick_rate, tilemaps=get_tilemaps(args)))
+    print(json_dumps(stats))
+    raise SystemExit(stats['invalid'] > 0)
+
+
+def get_parser():
+    parser = ArgumentParser(prog='spiritual')
+    parser.add_argument('--record', metavar='LOG',
+                        help='record the session input to a replay log')
+    parser.add_argument('--budget', type=parse_budget, action='append',
+                        default=[], metavar='CATEGORY=MIB',
+                        help='memory budget of a category, repeatable')
+    subparsers = parser.add_subparsers(dest='command')
+
+    convert_parser = subparsers.add_parser(
+        'convert', help='convert a boolmap tilemap to the chunked format')
+    convert_parser.add_argument('source')
+    convert_parser.add_argument('target')
+    convert_parser.add_argument('--chunk-size', type=int, default=16)
+    convert_parser.set_defaults(func=convert)
+
+    bench_parser = subparsers.add_parser('bench', help='run benchmarks')
+    bench_parser.add_argument('names', nargs='*')
+    bench_parser.set_defaults(func=bench)
+
+    check_parser = subparsers.add_parser(
+        'check', help='round-trip, throughput and game state checks')
+    check_parser.add_argument('--cases', type=int, default=500)
+    check_parser.add_argument('--seed', type=int, default=0)
+    check_parser.add_argument('--baseline', metavar='JSON',
+                              help='fail on throughput below this baseline')
+    check_parser.add_argument('--threshold', type=float, default=0.3,
+                              help='allowed slowdown against the baseline')
+    check_parser.add_argument('--save-baseline', metavar='JSON')
+    check_parser.set_defaults(func=check)
+
+    memory_parser = subparsers.add_parser(
+        'memory', help='report memory use by category after some frames')
+    memory_parser.add_argument('--frames', type=int, default=60)
+    memory_parser.add_argument('-o', '--output', metavar='JSON')
+    memory_parser.set_defaults(func=memory)
+
+    replay_parser = subparsers.add_parser(
+        'replay', help='replay recorded sessions headlessly')
+    replay_parser.add_argument('logs', nargs='+')
+    replay_parser.set_defaults(func=replay)
+
+    profiles_parser = subparsers.add_parser(
+        'profiles', help='validate, resave or migrate a profile directory')
+    profiles_parser.add_argument('mode')
+    profiles_parser.add_argument('directory', nargs='?')
+    profiles_parser.add_argument('-j', '--workers', type=int, nargs='+',
+                                 default=[cpu_count() or 1])
+    profiles_parser.add_argument('-o', '--output', metavar='JSONL',
+                                 help='write results here instead of stdout')
+    profiles_parser.set_defaults(func=profiles)
+
+    serve_parser = subparsers.add_parser(
+        'serve', help='run headless game sessions for socket clients')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=7450)
+    serve_parser.add_argument('--tick-rate', type=int, default=60)
+    serve_parser.add_argument('--shared', action='store_true',
+                              help='attach the memory-mapped tilemaps')
+    serve_parser.set_defaults(func=serve)
+
+    loadtest_parser = subparsers.add_parser(
+        'loadtest', help='drive a local server with simulated clients')
+    loadtest_parser.add_argument('--sessions', type=int, default=100)
+    loadtest_parser.add_argument('--clients', type=int, default=10)
+    loadtest_parser.add_argument('--seconds', type=float, default=5.0)
+    loadtest_parser.add_argument('--tick-rate', type=int, default=60)
+    loadtest_parser.add_argument('--shared', action='store_true',
+                                 help='attach the memory-mapped tilemaps')
+    loadtest_parser.set_defaults(func=loadtest)
+
+    return parser
+
+
 if __name__ == '__main__':
+    args = get_parser().parse_args()
+    if args.command in ('check', 'replay', 'serve', 'loadtest', 'memory'):
+        environ.setdefault('SDL_VIDEODRIVER', 'dummy')
     init()
-    main()
+    if args.budget:
+        from .memory import MEMORY
+        for category, budget in args.budget:
+            MEMORY.set_budget(category, budget)
+    if args.command is None:
+        main(args.record)
+    else:
+        args.func(args)
     # test()
@@ -1,3 +1,4 @@
+from .effect import apply_effects, compile_effects
 from .smartdata import SmartData
 
 __all__ = ['Ability']
@@ -6,3 +7,14 @@ __all__ = ['Ability']
 class Ability(SmartData):
     name: str
     effects: list[str]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # invalid effects fail when the ability is loaded, not when used
+        try:
+            self.ops = compile_effects(self.effects)
+        except ValueError as error:
+            raise ValueError(f'ability {self.name}: {error}') from None
+
+    def use(self, source, target):
+        apply_effects(self.ops, source, target)
@@ -0,0 +1,158 @@
+from numbers import Number
+
+from .smartdata import SmartData
+
+__all__ = [
+    'Condition', 'Achievement', 'SkillRule', 'AchievementEngine',
+    'ACHIEVEMENTS', 'SKILL_RULES',
+    'ITEM_GAINED', 'LOCATION_ENTERED', 'BATTLE_WON',
+]
+
+ITEM_GAINED = 'item_gained'
+LOCATION_ENTERED = 'location_entered'
+BATTLE_WON = 'battle_won'
+
+
+class Condition(SmartData):
+    # met once the amounts of matching events add up to count, an empty
+    # key matches the event for any key
+    event: str
+    key: str = ''
+    count: int = 1
+
+
+class Achievement(SmartData):
+    name: str
+    conditions: list[Condition]
+    skills: dict[str, Number] = {}
+
+
+class SkillRule(SmartData):
+    # every matching event adds amount times its own amount to the skill
+    skill: str
+    event: str
+    key: str = ''
+    amount: Number = 1
+
+
+class AchievementEngine:
+    achievements: dict[str, Achievement]
+    watchers: dict[tuple[str, str], list[tuple[Achievement, int]]]
+    rules: dict[tuple[str, str], list[SkillRule]]
+    missing: dict[str, int]
+
+    def __init__(self, profile, achievements=(), rules=()):
+        self.profile = profile
+        self.achievements = {}
+        self.watchers = {}
+        self.rules = {}
+        self.missing = {}
+        self.listeners = []
+        self.item_counts = None
+        for achievement in achievements:
+            self.add(achievement)
+        for rule in rules:
+            self.rules.setdefault((rule.event, rule.key), []).append(rule)
+
+    def add(self, achievement):
+        # only unfinished conditions of locked achievements are watched
+        if achievement.name in self.achievements:
+            raise ValueError(f'duplicate achievement {achievement.name}')
+        self.achievements[achievement.name] = achievement
+        if self.profile.achievements.get(achievement.name):
+            return
+        missing = 0
+        for i, condition in enumerate(achievement.conditions):
+            if self.get_progress(achievement, i) < condition.count:
+                missing += 1
+                self.watchers.setdefault(
+                    (condition.event, condition.key), []).append(
+                    (achievement, i))
+        self.missing[achievement.name] = missing
+        if missing == 0:
+            self.unlock(achievement)
+
+    def subscribe(self, listener):
+        # listener(achievement) is called when an achievement unlocks
+        self.listeners.append(listener)
+
+    def watch_inventory(self, inventory):
+        self.item_counts = {**inventory.counts}
+        inventory.subscribe(self.on_item_count)
+
+    def unwatch_inventory(self, inventory):
+        inventory.unsubscribe(self.on_item_count)
+
+    def on_item_count(self, name, count):
+        gained = count - self.item_counts.get(name, 0)
+        if count:
+            self.item_counts[name] = count
+        else:
+            self.item_counts.pop(name, None)
+        if gained > 0:
+            self.fire(ITEM_GAINED, name, gained)
+
+    @staticmethod
+    def get_progress_key(achievement, index):
+        return f'{achievement.name}/{index}'
+
+    def get_progress(self, achievement, index):
+        return self.profile.progress.get(
+            self.get_progress_key(achievement, index), 0)
+
+    def fire(self, event, key='', amount=1):
+        skills = self.profile.skills
+        for rule_key in ((event, key), (event, '')) if key else ((event, ''),):
+            for rule in self.rules.get(rule_key, ()):
+                skills[rule.skill] = (skills.get(rule.skill, 0)
+                                      + rule.amount * amount)
+            watchers = self.watchers.get(rule_key)
+            if watchers:
+                self.advance(rule_key, watchers, amount)
+
+    def advance(self, watch_key, watchers, amount):
+        progress = self.profile.progress
+        done = []
+        for achievement, i in watchers:
+            progress_key = self.get_progress_key(achievement, i)
+            value = progress.get(progress_key, 0) + amount
+            progress[progress_key] = value
+            if value >= achievement.conditions[i].count:
+                done.append((achievement, i))
+        if not done:
+            return
+        # met conditions stop listening
+        remaining = [watcher for watcher in watchers if watcher not in done]
+        if remaining:
+            self.watchers[watch_key] = remaining
+        else:
+            del self.watchers[watch_key]
+        for achievement, i in done:
+            self.missing[achievement.name] -= 1
+            if self.missing[achievement.name] == 0:
+                self.unlock(achievement)
+
+    def unlock(self, achievement):
+        del self.missing[achievement.name]
+        self.profile.achievements[achievement.name] = True
+        for i in range(len(achievement.conditions)):
+            self.profile.progress.pop(
+                self.get_progress_key(achievement, i), None)
+        skills = self.profile.skills
+        for skill, amount in achievement.skills.items():
+            skills[skill] = skills.get(skill, 0) + amount
+        for listener in self.listeners:
+            listener(achievement)
+
+
+ACHIEVEMENTS = [
+    Achievement('first_steps', [Condition(LOCATION_ENTERED, key='spawn')]),
+    Achievement('collector', [Condition(ITEM_GAINED, count=100)],
+                skills={'gathering': 5}),
+    Achievement('victor', [Condition(BATTLE_WON, count=10)],
+                skills={'combat': 5}),
+]
+SKILL_RULES = [
+    SkillRule('gathering', ITEM_GAINED, amount=0.1),
+    SkillRule('combat', BATTLE_WON),
+]
@@ -0,0 +1,81 @@
+from pygame.transform import scale as transform_scale
+
+from .element import Element
+from .memory import surface_nbytes
+from .tilemap import TILE_ANIMATIONS, TILE_FRAMES
+
+__all__ = ['AnimationClock', 'AnimatedTiles']
+
+
+class AnimationClock:
+    # one clock for every animated tile so they stay in step
+    time: float
+
+    def __init__(self):
+        self.time = 0.0
+
+    def tick(self, dt):
+        self.time += dt
+
+    def get_frame(self, tile):
+        count, duration = TILE_ANIMATIONS[tile]
+        return int(self.time / duration) % count
+
+
+class AnimatedTiles(Element):
+    # draws the animated cells over the baked chunks, which leave those
+    # cells empty, so a new frame never re-bakes a chunk
+    cells: dict[tuple[int, int], dict[tuple[int, int], str]]
+    visible: list[tuple[int, int]]
+    scaled: dict[tuple[str, int], object]
+
+    chunk_tiles: int = 16
+
+    def __init__(self, camera, clock):
+        self.camera = camera
+        self.clock = clock
+        self.cells = {}
+        self.visible = []
+        self.scaled = {}
+        self.scaled_size = None
+
+    def clear(self):
+        self.cells.clear()
+        self.visible = []
+
+    def set_tile(self, x, y, tile):
+        chunk = (x // self.chunk_tiles, y // self.chunk_tiles)
+        if tile in TILE_ANIMATIONS:
+            self.cells.setdefault(chunk, {})[x, y] = tile
+        elif chunk in self.cells:
+            self.cells[chunk].pop((x, y), None)
+            if not self.cells[chunk]:
+                del self.cells[chunk]
+
+    def get_nbytes(self):
+        return sum(surface_nbytes(frame) for frame in self.scaled.values())
+
+    def get_frame(self, tile, size):
+        key = (tile, self.clock.get_frame(tile))
+        frame = self.scaled.get(key)
+        if frame is None:
+            frame = self.scaled[key] = transform_scale(
+                TILE_FRAMES[tile][key[1]], (size, size))
+        return frame
+
+    def draw(self, queue):
+        size = self.camera.tile_size * self.camera.scale
+        if size != self.scaled_size:
+            self.scaled.clear()
+            self.scaled_size = size
+        frames = {}
+        to_screen = self.camera.to_screen
+        for chunk in self.visible:
+            cells = self.cells.get(chunk)
+            if cells is None:
+                continue
+            for (x, y), tile in cells.items():
+                frame = frames.get(tile)
+                if frame is None:
+                    frame = frames[tile] = self.get_frame(tile, size)
+                queue.blit(frame, to_screen(x, y))
@@ -1,21 +1,48 @@
 from pygame.font import Font, init as init_font
 from pygame.image import load as image_load
 
+from .memory import MEMORY
+
 __all__ = [
-    'FONT', 'FONTS', 'TITLE_FONT', 'TITLE_FONTS',
+    'FONT', 'FONTS', 'TITLE_FONT', 'TITLE_FONTS', 'DEBUG_FONTS', 'FontSizes',
     'PLAYER_DIRECTIONS',
 ]
 
+# pygame does not expose the size of a face; measured as the resident
+# memory of a face after rendering some text with it
+FONT_NBYTES = 128 * 1024
+
 init_font()
 
+
+class FontSizes(dict):
+    # faces are opened on first use, only a few of the sizes ever are
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def __missing__(self, size):
+        if not 8 <= size <= 72:
+            raise KeyError(size)
+        font = self[size] = Font(self.path, size)
+        return font
+
+    def get_nbytes(self):
+        return len(self) * FONT_NBYTES
+
+
 FONT = Font('./assets/Bakemono-Stereo-Regular.ttf', 24)
-FONTS = {}
-for size in range(8, 73):
-    FONTS[size] = Font('./assets/Bakemono-Stereo-Regular.ttf', size)
+FONTS = FontSizes('./assets/Bakemono-Stereo-Regular.ttf')
 TITLE_FONT = Font('./assets/Bakemono-Stereo-Bold.ttf', 24)
-TITLE_FONTS = {}
-for size in range(8, 73):
-    TITLE_FONTS[size] = Font('./assets/Bakemono-Stereo-Bold.ttf', size)
+TITLE_FONTS = FontSizes('./assets/Bakemono-Stereo-Bold.ttf')
+# the game fonts have no digits, None is pygame's default font
+DEBUG_FONTS = FontSizes(None)
+
+MEMORY.register('fonts', 'regular',
+                lambda: FONTS.get_nbytes() + FONT_NBYTES)
+MEMORY.register('fonts', 'title',
+                lambda: TITLE_FONTS.get_nbytes() + FONT_NBYTES)
+MEMORY.register('fonts', 'debug', DEBUG_FONTS.get_nbytes)
 
 PLAYER_DIRECTIONS = [
     image_load('./assets/player_back.png'),
@@ -0,0 +1,81 @@
+from pygame.constants import SRCALPHA
+from pygame.display import get_surface
+from pygame.surface import Surface
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from os import cpu_count
+
+from .tilemap import TILE_ANIMATIONS, TILES
+
+__all__ = ['bake_chunk', 'ChunkBaker']
+
+
+def bake_chunk(tilemap, x, y, chunk_tiles=16):
+    # the static layer of one chunk, plus the animated cells it leaves empty
+    width, height = tilemap.get_size()
+    chunk = Surface((chunk_tiles * 16, chunk_tiles * 16), SRCALPHA)
+    if get_surface() is not None:
+        chunk = chunk.convert_alpha()
+    blits = []
+    animated = []
+    for i in range(min(chunk_tiles, width - x * chunk_tiles)):
+        for j in range(min(chunk_tiles, height - y * chunk_tiles)):
+            tile = tilemap[x * chunk_tiles + i, y * chunk_tiles + j]
+            if tile in TILE_ANIMATIONS:
+                animated.append(
+                    (x * chunk_tiles + i, y * chunk_tiles + j, tile))
+            else:
+                blits.append((TILES[tile], (i * 16, j * 16)))
+    # blitting releases the GIL, so chunks bake in parallel
+    chunk.blits(blits, doreturn=False)
+    return chunk, animated
+
+
+class ChunkBaker:
+    # bakes chunks on a thread pool; the main thread collects them in
+    # queue order, which is nearest to the focus first
+    pending: deque
+
+    def __init__(self, workers=None):
+        self.workers = workers or cpu_count() or 1
+        self.executor = None
+        self.pending = deque()
+
+    def start(self, tilemap, chunks, focus=(0, 0)):
+        self.cancel()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix='bake')
+        fx, fy = focus
+        for x, y in sorted(chunks, key=lambda chunk: (
+                (chunk[0] - fx) ** 2 + (chunk[1] - fy) ** 2)):
+            self.pending.append(
+                ((x, y), self.executor.submit(bake_chunk, tilemap, x, y)))
+
+    def poll(self):
+        # the finished chunks at the front of the queue, without blocking
+        while self.pending and self.pending[0][1].done():
+            chunk, future = self.pending.popleft()
+            yield chunk, future.result()
+
+    def wait_for(self, chunks):
+        # blocks until the given chunks and every chunk ahead of them are
+        # done, so they come out of the next poll
+        chunks = {*chunks}
+        last = -1
+        for i, (chunk, _) in enumerate(self.pending):
+            if chunk in chunks:
+                last = i
+        wait([future for _, future in [*self.pending][:last + 1]])
+
+    def cancel(self):
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+    def close(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,822 @@
+from pygame.constants import SRCALPHA
+from pygame.surface import Surface
+from pygame.transform import scale as transform_scale
+
+from io import BytesIO, StringIO
+from json import dumps as json_dumps, loads as json_loads
+from math import inf
+from multiprocessing import get_context
+from numbers import Number
+from os import cpu_count, path as os_path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import (
+    get_traced_memory, start as start_tracing, stop as stop_tracing,
+)
+from types import GenericAlias, NoneType, UnionType
+
+from .ability import Ability
+from .achievement import Achievement, AchievementEngine, Condition, SkillRule
+from .animation import AnimatedTiles, AnimationClock
+from .baking import ChunkBaker
+from .camera import Camera
+from .effect import Combatant, apply_effects, parse_effect
+from .element import Sprite
+from .inventory import Inventory
+from .mapfile import MapFile, encode as encode_mapfile
+from .minimap import Minimap
+from .mob import Mob
+from .mobsystem import MobSystem
+from .myjson import dumps as myjson_dumps
+from .pathfinding import FlowField, Pathfinder
+from .profile import Profile
+from .recipe import Recipe, RecipeBook
+from .render import RenderQueue
+from .sharedmap import SharedTilemap, write_shared
+from .smartdata import SmartData
+from .tilemap import TILE_FRAMES, TILES, Tilemap, TilemapData
+
+__all__ = [
+    'BENCHMARKS', 'bench_tilemap_format', 'bench_mobs', 'bench_pathfinding',
+    'bench_recipes', 'bench_inventory', 'bench_achievements',
+    'bench_tracking', 'bench_shared_tilemaps', 'bench_effects',
+    'bench_decoder', 'check_serialization', 'check_game_reentry',
+    'bench_render', 'bench_animation', 'bench_baking', 'bench_minimap',
+]
+
+
+def _timeit(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def _random_grid(size, tile_count, seed=0):
+    # overlapping rectangles, so the map has runs like a hand-made one
+    rng = Random(seed)
+    tiles = [f'tile{i}' for i in range(tile_count)]
+    grid = [[tiles[0]] * size for _ in range(size)]
+    for _ in range(size * size // 64):
+        tile = rng.choice(tiles)
+        x, y = rng.randrange(size), rng.randrange(size)
+        width, height = rng.randint(1, 16), rng.randint(1, 16)
+        for i in range(x, min(x + width, size)):
+            grid[i][y:y + height] = [tile] * len(grid[i][y:y + height])
+    return grid, {tile: f'assets/{tile}.png' for tile in tiles}
+
+
+def bench_tilemap_format(sizes=(64, 256, 512), tile_count=8):
+    print(f'{"size":>6} {"boolmap KiB":>12} {"map KiB":>9} '
+          f'{"boolmap load":>13} {"map load":>9} {"chunk load":>11}')
+    for size in sizes:
+        grid, sources = _random_grid(size, tile_count)
+        boolmaps = {
+            tile: [[int(grid[x][y] == tile) for x in range(size)]
+                   for y in range(size)]
+            for tile in sources
+        }
+        boolmap_text = json_dumps({'boolmaps': boolmaps, 'sources': sources})
+        map_data = encode_mapfile(grid, sources)
+
+        boolmap_time = _timeit(lambda: Tilemap.loaddata(
+            TilemapData.loads(json_loads(boolmap_text))))
+        map_time = _timeit(lambda: Tilemap.loadfile(BytesIO(map_data)))
+        chunk_time = _timeit(
+            lambda: MapFile(BytesIO(map_data)).read_chunk(0, 0))
+        print(f'{size:>6} {len(boolmap_text) / 1024:>12.1f} '
+              f'{len(map_data) / 1024:>9.1f} {boolmap_time * 1000:>11.1f}ms '
+              f'{map_time * 1000:>7.1f}ms {chunk_time * 1000:>9.3f}ms')
+
+
+def _random_location(size, wall_ratio=0.1, seed=0, blocks=False):
+    # scattered single walls, or wall blocks of up to 8x8 tiles
+    rng = Random(seed)
+    if not blocks:
+        grid = [['empty' if rng.random() < wall_ratio else 'grass'
+                 for _ in range(size)] for _ in range(size)]
+        return Tilemap(grid, {'grass': 'assets/grass.png'})
+    grid = [['grass'] * size for _ in range(size)]
+    for _ in range(round(size * size * wall_ratio / 20)):
+        x, y = rng.randrange(size), rng.randrange(size)
+        width, height = rng.randint(1, 8), rng.randint(1, 8)
+        for i in range(x, min(x + width, size)):
+            grid[i][y:y + height] = ['empty'] * len(grid[i][y:y + height])
+    return Tilemap(grid, {'grass': 'assets/grass.png'})
+
+
+def bench_mobs(counts=(100, 1000, 10000), ticks=200):
+    tilemap = _random_location(256)
+    rng = Random(0)
+    print(f'{"mobs":>6} {"ticks/s":>9} {"mob ticks/s":>12}')
+    for count in counts:
+        system = MobSystem(tilemap)
+        mob = Mob('rook', [], [], [])
+        for _ in range(count):
+            system.spawn(mob, (rng.randrange(256) + 0.5,
+                               rng.randrange(256) + 0.5))
+        directions = [[rng.randint(-1, 1), rng.randint(-1, 1)]
+                      for _ in range(count)]
+        system.directions[:count] = directions
+        start = perf_counter()
+        for _ in range(ticks):
+            system.tick(1 / 60)
+        rate = ticks / (perf_counter() - start)
+        print(f'{count:>6} {rate:>9.0f} {rate * count:>12.0f}')
+
+
+def bench_pathfinding(sizes=(256, 512), queries=200, radii=(32, 64, None)):
+    print(f'{"map":>11} {"A* JPS":>11} {"cached":>12} '
+          + ' '.join(f'{f"field r={radius}":>12}' for radius in radii))
+    for size, blocks in ((size, blocks) for size in sizes
+                         for blocks in (False, True)):
+        tilemap = _random_location(size, blocks=blocks)
+        rng = Random(size)
+        open_tiles = [(x, y) for x in range(size) for y in range(size)
+                      if not tilemap.collides(x, y)]
+        pairs = [(rng.choice(open_tiles), rng.choice(open_tiles))
+                 for _ in range(queries)]
+        pathfinder = Pathfinder(tilemap)
+        pathfinder.cache_size = queries
+
+        start = perf_counter()
+        for pair in pairs:
+            pathfinder.find_path(*pair)
+        search_rate = queries / (perf_counter() - start)
+        start = perf_counter()
+        for pair in pairs:
+            pathfinder.find_path(*pair)
+        cached_rate = queries / (perf_counter() - start)
+
+        mask = tilemap.get_mask()
+        target = rng.choice(open_tiles)
+        field_times = [_timeit(lambda: FlowField(mask, target, radius))
+                       for radius in radii]
+        print(f'{size:>4} {"blocks" if blocks else "noise":>6} '
+              f'{search_rate:>9.0f}/s {cached_rate:>10.0f}/s '
+              + ' '.join(f'{time * 1000:>10.1f}ms' for time in field_times))
+
+
+def bench_recipes(counts=(1000, 10000), updates=100000, queries=1000):
+    print(f'{"recipes":>8} {"updates/s":>10} {"resolves/s":>11} '
+          f'{"craftable":>10}')
+    for count in counts:
+        rng = Random(count)
+        # items 0..count/4 are raw, every recipe uses lower numbered items
+        raw = count // 4
+        recipes = []
+        for i in range(count):
+            result = raw + i // 2
+            ingredients = {f'item{rng.randrange(result)}': rng.randint(1, 3)
+                           for _ in range(rng.randint(1, 4))}
+            recipes.append(Recipe(f'recipe{i}', ingredients, f'item{result}',
+                                  count=rng.randint(1, 4)))
+        book = RecipeBook(recipes)
+        items = [f'item{i}' for i in range(raw + count // 2)]
+        changes = [(rng.choice(items), rng.randint(0, 20))
+                   for _ in range(updates)]
+
+        start = perf_counter()
+        for item, amount in changes:
+            book.update(item, amount)
+        update_rate = updates / (perf_counter() - start)
+        targets = [rng.choice(items[raw:]) for _ in range(queries)]
+        start = perf_counter()
+        for target in targets:
+            book.resolve(target)
+        resolve_rate = queries / (perf_counter() - start)
+        print(f'{count:>8} {update_rate:>10.0f} {resolve_rate:>11.0f} '
+              f'{len(book.craftable):>10}')
+
+
+def bench_inventory(counts=(1000, 100000), queries=10000):
+    print(f'{"entries":>8} {"kind":>9} {"has/s":>10} {"count/s":>10} '
+          f'{"add+rm/s":>10} {"load ms":>8} {"dump ms":>8}')
+    for count in counts:
+        rng = Random(count)
+        names = [f'item{rng.randrange(count)}' for _ in range(count)]
+        targets = [rng.choice(names) for _ in range(queries)]
+        inventory = Inventory()
+        inventory.add_many(names)
+        # the old flat list form, probed with fewer queries as it scans
+        items = [*names]
+        list_queries = max(queries * 1000 // count, 10)
+
+        def run(has, count_item, add_remove, n):
+            start = perf_counter()
+            for target in targets[:n]:
+                has(target)
+            has_rate = n / (perf_counter() - start)
+            start = perf_counter()
+            for target in targets[:n]:
+                count_item(target)
+            count_rate = n / (perf_counter() - start)
+            start = perf_counter()
+            for target in targets[:n]:
+                add_remove(target)
+            return has_rate, count_rate, n / (perf_counter() - start)
+
+        def list_add_remove(target):
+            items.append(target)
+            items.remove(target)
+
+        def add_remove(target):
+            inventory.add(target)
+            inventory.remove(target)
+
+        obj = json_loads(json_dumps(items))
+        list_rates = run(items.__contains__, items.count, list_add_remove,
+                         list_queries)
+        list_times = (_timeit(lambda: Inventory.loads(obj)),
+                      _timeit(lambda: json_dumps(items)))
+        rates = run(inventory.has, inventory.count, add_remove, queries)
+        obj = json_loads(json_dumps(inventory.dumps()))
+        times = (_timeit(lambda: Inventory.loads(obj)),
+                 _timeit(lambda: json_dumps(inventory.dumps())))
+        for kind, (has_rate, count_rate, add_rate), (load, dump) in (
+                ('list', list_rates, list_times),
+                ('inventory', rates, times)):
+            print(f'{count:>8} {kind:>9} {has_rate:>10.0f} {count_rate:>10.0f} '
+                  f'{add_rate:>10.0f} {load * 1000:>8.1f} {dump * 1000:>8.1f}')
+
+
+def bench_achievements(counts=(100, 1000), events=100000):
+    print(f'{"achievements":>12} {"events/s":>10} {"rescan/s":>10} '
+          f'{"unlocked":>9}')
+    for count in counts:
+        rng = Random(count)
+        kinds = [f'event{i}' for i in range(20)]
+        keys = [f'key{i}' for i in range(50)]
+        achievements = [
+            Achievement(f'achievement{i}', [
+                Condition(rng.choice(kinds), key=rng.choice(keys + [''] * 10),
+                          count=rng.randint(1, 500))
+                for _ in range(rng.randint(1, 3))])
+            for i in range(count)]
+        rules = [SkillRule(f'skill{i}', rng.choice(kinds),
+                           key=rng.choice(keys), amount=0.5)
+                 for i in range(count // 10)]
+        fired = [(rng.choice(kinds), rng.choice(keys), rng.randint(1, 3))
+                 for _ in range(events)]
+
+        profile = Profile.new('bench')
+        engine = AchievementEngine(profile, achievements, rules)
+        start = perf_counter()
+        for event, key, amount in fired:
+            engine.fire(event, key, amount)
+        rate = events / (perf_counter() - start)
+
+        # every condition re-checked after every event
+        totals = {}
+        unlocked = {*()}
+        scanned = events // 100
+        start = perf_counter()
+        for event, key, amount in fired[:scanned]:
+            totals[event, key] = totals.get((event, key), 0) + amount
+            totals[event, ''] = totals.get((event, ''), 0) + amount
+            for achievement in achievements:
+                if all(totals.get((condition.event, condition.key), 0)
+                       >= condition.count
+                       for condition in achievement.conditions):
+                    unlocked.add(achievement.name)
+        rescan_rate = scanned / (perf_counter() - start)
+        print(f'{count:>12} {rate:>10.0f} {rescan_rate:>10.0f} '
+              f'{len(profile.achievements):>9}')
+
+
+def bench_tracking(sizes=(1000, 100000), changes=(1, 100, 1000)):
+    print(f'{"entries":>8} {"changes":>8} {"dumps ms":>9} {"patch ms":>9} '
+          f'{"dumps kB":>9} {"patch kB":>9}')
+    for size in sizes:
+        rng = Random(size)
+        profile = Profile.new('bench')
+        profile.items.add_many({f'item{i}': rng.randint(1, 99)
+                                for i in range(size)})
+        profile.track()
+        for count in changes:
+            names = [f'item{rng.randrange(size * 2)}' for _ in range(count)]
+
+            def change():
+                for name in names:
+                    profile.items.add(name)
+                    profile.skills[name] = profile.skills.get(name, 0) + 1
+
+            change()
+            start = perf_counter()
+            full = json_dumps(profile.dumps())
+            full_time = perf_counter() - start
+            start = perf_counter()
+            patch = json_dumps(profile.checkpoint())
+            patch_time = perf_counter() - start
+            print(f'{size:>8} {count:>8} {full_time * 1000:>9.2f} '
+                  f'{patch_time * 1000:>9.3f} {len(full) / 1024:>9.1f} '
+                  f'{len(patch) / 1024:>9.1f}')
+
+
+def _get_pss():
+    # proportional set size, a page shared by n processes counts 1/n
+    with open('/proc/self/smaps_rollup') as file:
+        for line in file:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    raise OSError('no Pss in smaps_rollup')
+
+
+def _memory_worker(kind, path, barrier, results):
+    barrier.wait()
+    before = _get_pss()
+    if kind == 'shared':
+        tilemap = SharedTilemap(path)
+        # fault every page in, as a worker walking the map would
+        int(tilemap.get_mask().sum()) + int(tilemap.get_tiles().sum())
+    else:
+        with open(path, 'rb') as file:
+            tilemap = Tilemap.loadfile(file)
+        tilemap.get_mask()
+    barrier.wait()
+    results.put(_get_pss() - before)
+    barrier.wait()
+
+
+def bench_shared_tilemaps(workers=(1, 2, 4, 8), size=1024):
+    if not os_path.exists('/proc/self/smaps_rollup'):
+        print('needs /proc/self/smaps_rollup')
+        return
+    print(f'{"workers":>8} {"kind":>8} {"total MiB":>10} {"per worker":>11}')
+    context = get_context('spawn')
+    with TemporaryDirectory() as directory:
+        tilemap = _random_location(size, 0.2, blocks=True)
+        map_path = os_path.join(directory, 'bench.map')
+        with open(map_path, 'wb') as file:
+            tilemap.dumpfile(file)
+        shared_path = os_path.join(directory, 'bench.shm')
+        write_shared(shared_path, tilemap)
+        del tilemap
+        for count in workers:
+            for kind, path in (('loaded', map_path),
+                               ('shared', shared_path)):
+                barrier = context.Barrier(count + 1)
+                results = context.Queue()
+                processes = [context.Process(
+                    target=_memory_worker,
+                    args=(kind, path, barrier, results))
+                    for _ in range(count)]
+                for process in processes:
+                    process.start()
+                barrier.wait()
+                barrier.wait()
+                # every worker holds its map while the others measure
+                total = sum(results.get() for _ in range(count))
+                barrier.wait()
+                for process in processes:
+                    process.join()
+                print(f'{count:>8} {kind:>8} {total / 2 ** 20:>10.1f} '
+                      f'{total / count / 2 ** 20:>11.2f}')
+
+
+def _random_effect(rng):
+    return rng.choice((
+        f'damage {rng.randint(1, 6)}', f'heal {rng.randint(1, 4)}',
+        f'shield {rng.randint(1, 3)}', f'drain {rng.randint(1, 3)}',
+        f'poison {rng.randint(1, 2)} {rng.randint(1, 3)}',
+        f'buff attack {rng.randint(0, 1)}', 'debuff attack 1',
+    ))
+
+
+def _battle(order, use):
+    # two combatants take turns until one falls, returns effects applied
+    fighters = [Combatant(100), Combatant(100)]
+    applied = 0
+    for turn, ability in enumerate(order):
+        source = fighters[turn % 2]
+        target = fighters[1 - turn % 2]
+        use(ability, source, target)
+        applied += len(ability.effects)
+        target.tick()
+        if not target.alive:
+            break
+    return applied
+
+
+def bench_effects(battles=(100, 1000, 10000), abilities=50, turns=50):
+    rng = Random(0)
+    pool = [Ability(f'ability{i}', [_random_effect(rng)
+                                    for _ in range(rng.randint(1, 4))])
+            for i in range(abilities)]
+
+    def interpreted(ability, source, target):
+        # what every use would cost without compiling at load time
+        for text in ability.effects:
+            function, args = parse_effect(text)
+            function(source, target, *args)
+
+    def compiled(ability, source, target):
+        apply_effects(ability.ops, source, target)
+
+    print(f'{"battles":>8} {"interpreted/s":>14} {"compiled/s":>11} '
+          f'{"speedup":>8}')
+    for count in battles:
+        orders = [[rng.choice(pool) for _ in range(turns)]
+                  for _ in range(count)]
+        rates = []
+        for use in (interpreted, compiled):
+            start = perf_counter()
+            applied = sum(_battle(order, use) for order in orders)
+            rates.append(applied / (perf_counter() - start))
+        print(f'{count:>8} {rates[0]:>14.0f} {rates[1]:>11.0f} '
+              f'{rates[1] / rates[0]:>7.1f}x')
+
+
+def _traced(func):
+    # peak bytes allocated while func runs, timed separately since
+    # tracing slows allocation down
+    start_tracing()
+    func()
+    peak = get_traced_memory()[1]
+    stop_tracing()
+    return peak
+
+
+def bench_decoder(items=100000, size=512):
+    profile = Profile.new('bench')
+    profile.items.add_many({f'item{i}': i + 1 for i in range(items)})
+    grid = [[int(x + y) % 3 == 0 for y in range(size)] for x in range(size)]
+    documents = (
+        ('profile', Profile, profile.dumps()),
+        ('tilemap', TilemapData, {
+            'sources': {'grass': 'assets/grass.png'},
+            'boolmaps': {'grass': grid, 'empty': grid}}),
+    )
+    print(f'{"document":>9} {"MiB":>6} {"task":>18} {"ms":>9} '
+          f'{"peak MiB":>9}')
+    with TemporaryDirectory() as directory:
+        for name, type_, obj in documents:
+            path = os_path.join(directory, f'{name}.json')
+            with open(path, 'w') as file:
+                file.write(json_dumps(obj))
+            del obj
+            first = next(iter(type_.__annotations__))
+
+            def run(func):
+                with open(path) as file:
+                    return func(file)
+
+            tasks = (
+                ('json.load+is_valid',
+                 lambda file: type_.is_valid(json_loads(file.read()))),
+                ('is_valid_stream', type_.is_valid_stream),
+                ('load_stream', type_.load_stream),
+                (f'{first} only',
+                 lambda file: dict(type_.iterload(file, [first]))),
+            )
+            for task, func in tasks:
+                elapsed = _timeit(lambda: run(func), repeat=1)
+                peak = _traced(lambda: run(func))
+                print(f'{name:>9} {os_path.getsize(path) / 2 ** 20:>6.1f} '
+                      f'{task:>18} {elapsed * 1000:>9.1f} '
+                      f'{peak / 2 ** 20:>9.2f}')
+
+
+class _Leaf(SmartData):
+    name: str
+    value: int | float | None
+    tags: set[str]
+    pair: tuple[int, str] = (0, '')
+
+
+class _Node(SmartData):
+    label: str
+    point: tuple[float, tuple[int, bool]]
+    leaves: list[_Leaf]
+    index: dict[str, list[int | str]]
+    child: _Leaf | None = None
+    amount: Number = 0
+    scores: dict[str, dict[str, float]] = {}
+
+
+# quotes, escapes, control characters and characters outside the BMP
+_CHARS = 'az Z09"\\/\n\r\t\b\f\v\x00\x1f\x7fé☃\U0001d11e'
+
+
+def _random_value(type_, rng, depth=0, size=4):
+    if isinstance(type_, type) and issubclass(type_, SmartData):
+        return type_(**{
+            key: _random_value(field_type, rng, depth + 1, size)
+            for key, field_type in type_.__annotations__.items()
+            if not hasattr(type_, key) or rng.random() < 0.7})
+    elif isinstance(type_, UnionType):
+        return _random_value(rng.choice(type_.__args__), rng, depth, size)
+    elif isinstance(type_, GenericAlias):
+        origin = type_.__origin__
+        args = type_.__args__
+        if origin is tuple:
+            return tuple(_random_value(arg, rng, depth + 1, size)
+                         for arg in args)
+        count = rng.randint(0, size if depth < 3 else 1)
+        if origin is dict:
+            return {_random_value(args[0], rng, depth + 1, size):
+                    _random_value(args[1], rng, depth + 1, size)
+                    for _ in range(count)}
+        return origin(_random_value(args[0], rng, depth + 1, size)
+                      for _ in range(count))
+    elif type_ is NoneType:
+        return None
+    elif type_ is bool:
+        return rng.random() < 0.5
+    elif type_ is int:
+        return rng.choice((0, -1, rng.randint(-1000, 1000),
+                           rng.randint(-2 ** 70, 2 ** 70)))
+    elif type_ is float:
+        return rng.choice((0.0, -0.0, 1e16, 1e-300, 2.5e300, inf, -inf,
+                           rng.uniform(-1e6, 1e6),
+                           rng.random() * 10 ** rng.randint(-30, 30)))
+    elif type_ is Number:
+        return _random_value(rng.choice((int, float)), rng, depth, size)
+    elif type_ is str:
+        return ''.join(rng.choice(_CHARS) for _ in range(rng.randint(0, 12)))
+    raise NotImplementedError(f'Unknown type: {type_}')
+
+
+def _same(a, b):
+    # exact equality, down to the types and the sign of zero
+    if type(a) is not type(b):
+        return False
+    elif isinstance(a, SmartData):
+        return all(_same(getattr(a, key), getattr(b, key))
+                   for key in a.__annotations__)
+    elif isinstance(a, float):
+        return repr(a) == repr(b)
+    elif isinstance(a, list | tuple):
+        return len(a) == len(b) and all(map(_same, a, b))
+    elif isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key])
+                                            for key in a)
+    return a == b
+
+
+def _round_trip(obj):
+    text = myjson_dumps(obj.dumps())
+    loaded = type(obj).loads(json_loads(text))
+    streamed = type(obj).load_stream(StringIO(text))
+    return text, loaded, streamed
+
+
+def check_serialization(cases=500, sizes=(10, 100, 1000), seed=0,
+                        baseline=None, threshold=0.3):
+    # dumps -> myjson -> json -> loads (and load_stream) must give back
+    # an equal object for random values of every supported field shape;
+    # returns the failures and the throughput in MB/s by document size
+    failures = []
+    rng = Random(seed)
+    types = (_Leaf, _Node, Recipe, Achievement)
+    for i in range(cases):
+        type_ = types[i % len(types)]
+        obj = _random_value(type_, rng)
+        try:
+            text, loaded, streamed = _round_trip(obj)
+        except (ValueError, TypeError) as error:
+            failures.append(f'{type_.__name__} case {i}: {error!r}')
+            continue
+        if not (_same(obj, loaded) and _same(obj, streamed)):
+            failures.append(f'{type_.__name__} case {i}: {text}')
+    print(f'{cases - len(failures)}/{cases} round trips exact')
+    for failure in failures[:5]:
+        print('  ' + failure[:200])
+
+    print(f'{"leaves":>7} {"KiB":>8} {"encode":>8} {"decode":>8} '
+          f'{"stream":>8} MB/s')
+    rates = {}
+    for size in sizes:
+        rng = Random(size)
+        obj = _Node(**{**vars(_random_value(_Node, rng)), 'leaves': [
+            _random_value(_Leaf, rng) for _ in range(size)]})
+        text = myjson_dumps(obj.dumps())
+        megabytes = len(text.encode()) / 1e6
+        for name, func in (
+                ('encode', lambda: myjson_dumps(obj.dumps())),
+                ('decode', lambda: _Node.loads(json_loads(text))),
+                ('stream', lambda: _Node.load_stream(StringIO(text)))):
+            rates[f'{name}/{size}'] = megabytes / _timeit(func)
+        print(f'{size:>7} {len(text) / 1024:>8.1f} '
+              f'{rates[f"encode/{size}"]:>8.2f} '
+              f'{rates[f"decode/{size}"]:>8.2f} '
+              f'{rates[f"stream/{size}"]:>8.2f}')
+
+    if baseline is not None:
+        for key, rate in baseline.items():
+            if key in rates and rates[key] < rate * (1 - threshold):
+                failures.append(f'{key} regressed: {rates[key]:.2f} MB/s '
+                                f'against a baseline of {rate:.2f}')
+                print(f'  REGRESSION {failures[-1]}')
+    return failures, rates
+
+
+def check_game_reentry(entries=3):
+    # leaving the game must drop the achievement listeners on the profile,
+    # or one item is credited once per visit
+    from .window import SpiritualWindow
+    window = SpiritualWindow()
+    window.profile = profile = Profile.new('check')
+    for _ in range(entries):
+        window.set_state('game')
+        window.set_state('menu')
+    window.set_state('game')
+    profile.items.add('wood')
+    window.close()
+    failures = []
+    if profile.skills != {'gathering': 0.1}:
+        failures.append(f'skills after {entries + 1} entries: '
+                        f'{profile.skills}')
+    if profile.progress != {'collector/0': 1}:
+        failures.append(f'progress after {entries + 1} entries: '
+                        f'{profile.progress}')
+    print(f'{"ok" if not failures else "FAILED":>8} game re-entry')
+    for failure in failures:
+        print('  ' + failure)
+    return failures
+
+
+def bench_serialization():
+    check_serialization()
+
+
+def bench_render(counts=(100, 1000, 10000), frames=20, size=(800, 600),
+                 layers=3):
+    rng = Random(0)
+    screen = Surface(size, SRCALPHA)
+    images = []
+    for i in range(8):
+        image = Surface((16, 16), SRCALPHA)
+        image.fill((32 * i, 255 - 32 * i, 128, 255))
+        images.append(image)
+
+    def direct(elements):
+        # every element blits straight to the screen, as before
+        for _ in range(frames):
+            for priority in range(layers):
+                for element in elements[priority]:
+                    element.draw(screen)
+
+    def queued(elements):
+        queue = RenderQueue(size)
+        for _ in range(frames):
+            for priority in range(layers):
+                queue.set_priority(priority)
+                for element in elements[priority]:
+                    element.draw(queue)
+            queue.present(screen)
+
+    print(f'{"sprites":>8} {"direct ms":>10} {"queued ms":>10} '
+          f'{"speedup":>8}')
+    for count in counts:
+        elements = [[] for _ in range(layers)]
+        for i in range(count):
+            sprite = Sprite(rng.choice(images), rng.uniform(-16, size[0]),
+                            rng.uniform(-16, size[1]), 16, 16, 2)
+            sprite.get_scaled()
+            elements[i % layers].append(sprite)
+        times = [_timeit(lambda: draw(elements)) / frames * 1000
+                 for draw in (direct, queued)]
+        print(f'{count:>8} {times[0]:>10.2f} {times[1]:>10.2f} '
+              f'{times[0] / times[1]:>7.2f}x')
+
+
+def bench_animation(ratios=(0.01, 0.1, 0.5), frames=20, size=(800, 600)):
+    # the visible 2x2 chunks around the camera, once by re-baking them for
+    # every animation frame and once by drawing the animated overlay
+    rng = Random(0)
+    screen = Surface(size, SRCALPHA)
+    camera = Camera(size, size)
+    camera.set_position(16, 16)
+    x_min, y_min, x_max, y_max = camera.visible_chunks()
+    chunks = [(x, y) for x in range(x_min, x_max + 1)
+              for y in range(y_min, y_max + 1)]
+
+    print(f'{"animated":>9} {"rebake ms":>10} {"overlay ms":>11} '
+          f'{"speedup":>8}')
+    for ratio in ratios:
+        grid = {(x * 16 + i, y * 16 + j):
+                'water' if rng.random() < ratio else 'grass'
+                for x, y in chunks for i in range(16) for j in range(16)}
+        clock = AnimationClock()
+        animated = AnimatedTiles(camera, clock)
+        animated.visible = chunks
+        for (x, y), tile in grid.items():
+            animated.set_tile(x, y, tile)
+
+        def rebake():
+            for _ in range(frames):
+                clock.tick(0.25)
+                for x, y in chunks:
+                    chunk = Surface((256, 256), SRCALPHA)
+                    for i in range(16):
+                        for j in range(16):
+                            tile = grid[x * 16 + i, y * 16 + j]
+                            image = (TILE_FRAMES[tile][clock.get_frame(tile)]
+                                     if tile == 'water' else TILES[tile])
+                            chunk.blit(image, (i * 16, j * 16))
+                    transform_scale(chunk, (1024, 1024))
+
+        def overlay():
+            queue = RenderQueue(size)
+            for _ in range(frames):
+                clock.tick(0.25)
+                animated.draw(queue)
+                queue.present(screen)
+
+        times = [_timeit(draw) / frames * 1000 for draw in (rebake, overlay)]
+        print(f'{ratio:>8.0%} {times[0]:>10.2f} {times[1]:>11.2f} '
+              f'{times[0] / times[1]:>7.1f}x')
+
+
+def bench_baking(sizes=(256, 512), workers=(1, 2, 4, 8), view=(3, 3)):
+    # a whole location through the thread pool, and the part a player
+    # waits for: the chunks in view around the center
+    print(f'{cpu_count()} cores')
+    print(f'{"size":>5} {"workers":>8} {"all ms":>8} {"view ms":>8} '
+          f'{"speedup":>8}')
+    for size in sizes:
+        rng = Random(0)
+        tilemap = Tilemap([[rng.choice(('grass', 'grass', 'empty', 'water'))
+                            for _ in range(size)] for _ in range(size)], {})
+        chunks = [(x, y) for x in range(-(-size // 16))
+                  for y in range(-(-size // 16))]
+        center = (size // 32, size // 32)
+        in_view = [(center[0] + x, center[1] + y)
+                   for x in range(-(view[0] // 2), view[0] // 2 + 1)
+                   for y in range(-(view[1] // 2), view[1] // 2 + 1)]
+        base = None
+        for count in workers:
+            baker = ChunkBaker(count)
+            # the first start pays for the thread startup
+            baker.start(tilemap, chunks[:count], center)
+            baker.wait_for(chunks[:count])
+            [*baker.poll()]
+
+            def bake_view():
+                baker.start(tilemap, chunks, center)
+                baker.wait_for(in_view)
+                baker.cancel()
+
+            def bake_all():
+                baker.start(tilemap, chunks, center)
+                baker.wait_for(chunks)
+                assert len([*baker.poll()]) == len(chunks)
+
+            view_time = _timeit(bake_view) * 1000
+            all_time = _timeit(bake_all) * 1000
+            baker.close()
+            base = base or all_time
+            print(f'{size:>5} {count:>8} {all_time:>8.1f} {view_time:>8.1f} '
+                  f'{base / all_time:>7.2f}x')
+
+
+def bench_minimap(sizes=(256, 1024, 2048), edits=1000, frames=1000):
+    rng = Random(0)
+    screen = Surface((800, 600), SRCALPHA)
+    print(f'{"size":>5} {"build ms":>9} {"edit us":>8} {"frame us":>9}')
+    for size in sizes:
+        tilemap = Tilemap([[rng.choice(('grass', 'grass', 'empty'))
+                            for _ in range(size)] for _ in range(size)], {})
+        minimap = Minimap()
+        build = _timeit(lambda: minimap.set_tilemap(tilemap))
+        cells = [(rng.randrange(size), rng.randrange(size),
+                  rng.choice(('grass', 'water', 'empty')))
+                 for _ in range(edits)]
+
+        def edit():
+            for cell in cells:
+                minimap.set_tile(*cell)
+
+        def draw():
+            queue = RenderQueue(screen.get_size())
+            for i in range(frames):
+                minimap.player = (i % size, i % size)
+                minimap.draw(queue)
+                queue.present(screen)
+
+        print(f'{size:>5} {build * 1000:>9.1f} '
+              f'{_timeit(edit, 1) / edits * 1e6:>8.1f} '
+              f'{_timeit(draw) / frames * 1e6:>9.1f}')
+
+
+BENCHMARKS = {
+    'tilemap_format': bench_tilemap_format,
+    'mobs': bench_mobs,
+    'pathfinding': bench_pathfinding,
+    'recipes': bench_recipes,
+    'inventory': bench_inventory,
+    'achievements': bench_achievements,
+    'tracking': bench_tracking,
+    'shared_tilemaps': bench_shared_tilemaps,
+    'effects': bench_effects,
+    'decoder': bench_decoder,
+    'serialization': bench_serialization,
+    'render': bench_render,
+    'animation': bench_animation,
+    'baking': bench_baking,
+    'minimap': bench_minimap,
+}
@@ -0,0 +1,92 @@
+from concurrent.futures import ProcessPoolExecutor
+from json import JSONDecodeError, loads as json_loads
+from os import remove, replace, scandir
+from pathlib import Path
+from time import perf_counter
+
+from .myjson import dumps as myjson_dumps
+from .profile import Profile
+from .smartdata import find_invalid
+
+__all__ = [
+    'MODES', 'check_profile', 'scan_profiles', 'run_profiles',
+    'get_default_directory', 'time_profiles',
+]
+
+# validate only reads, resave rewrites every valid profile and migrate
+# rewrites the ones whose stored form differs from the current one
+MODES = ('validate', 'resave', 'migrate')
+
+
+def _format_path(path):
+    return '.'.join(str(key) for key in path) or '$'
+
+
+def check_profile(path, mode='validate'):
+    result = {'path': path, 'ok': False, 'errors': [], 'written': False}
+    try:
+        with open(path) as file:
+            text = file.read()
+        data = json_loads(text)
+    except (OSError, UnicodeDecodeError, JSONDecodeError) as error:
+        result['errors'].append({'path': '$', 'error': str(error)})
+        return result
+    if not isinstance(data, dict) or not Profile.is_valid(data):
+        result['errors'] = [
+            {'path': _format_path(field), 'error': 'invalid'}
+            for field in find_invalid(data, Profile)]
+        return result
+    result['ok'] = True
+    if mode == 'validate':
+        return result
+
+    new_text = myjson_dumps(Profile.loads(data).dumps())
+    if mode == 'migrate' and new_text == text:
+        return result
+    temp_path = f'{path}.tmp'
+    try:
+        with open(temp_path, 'w') as file:
+            file.write(new_text)
+        replace(temp_path, path)
+    except OSError as error:
+        # the profile itself is untouched until the replace succeeds
+        try:
+            remove(temp_path)
+        except OSError:
+            pass
+        result['ok'] = False
+        result['errors'].append({'path': '$', 'error': str(error)})
+        return result
+    result['written'] = True
+    return result
+
+
+def _check(args):
+    return check_profile(*args)
+
+
+def scan_profiles(directory):
+    with scandir(directory) as entries:
+        return sorted(entry.path for entry in entries
+                      if entry.name.endswith('.json') and entry.is_file())
+
+
+def run_profiles(paths, mode='validate', workers=1, chunk_size=64):
+    # yields the results in path order while the pool works ahead
+    with ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(_check, [(path, mode) for path in paths],
+                                chunksize=chunk_size)
+
+
+def get_default_directory():
+    return Path.home().joinpath('spiritual', 'profiles')
+
+
+def time_profiles(paths, mode, workers, output=None):
+    start = perf_counter()
+    failed = 0
+    for result in run_profiles(paths, mode, workers):
+        failed += not result['ok']
+        if output is not None:
+            output(result)
+    return perf_counter() - start, failed
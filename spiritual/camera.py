@@ -0,0 +1,56 @@
+from math import floor
+
+__all__ = ['Camera']
+
+
+class Camera:
+    x: float
+    y: float
+    width: int
+    height: int
+    scale: float
+    changed: bool
+
+    tile_size: int = 64
+    chunk_tiles: int = 16
+
+    def __init__(self, size=(800, 600), default_size=(800, 600)):
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+        self.scale = 1
+        self.changed = True
+        self.set_size(size, default_size)
+
+    def set_size(self, size, default_size):
+        scale = min(size[0] / default_size[0], size[1] / default_size[1])
+        if (self.width, self.height, self.scale) != (*size, scale):
+            self.width, self.height = size
+            self.scale = scale
+            self.changed = True
+
+    def set_position(self, x, y):
+        if (self.x, self.y) != (x, y):
+            self.x = x
+            self.y = y
+            self.changed = True
+
+    def to_screen(self, x, y):
+        tile_size = self.tile_size * self.scale
+        return (
+            self.width * 0.5 + (x - self.x) * tile_size,
+            self.height * 0.5 + (y - self.y) * tile_size,
+        )
+
+    def visible_chunks(self):
+        # chunk index rectangle (inclusive) covering the window
+        tile_size = self.tile_size * self.scale
+        half_width = self.width * 0.5 / tile_size
+        half_height = self.height * 0.5 / tile_size
+        return (
+            floor((self.x - half_width) / self.chunk_tiles),
+            floor((self.y - half_height) / self.chunk_tiles),
+            floor((self.x + half_width) / self.chunk_tiles),
+            floor((self.y + half_height) / self.chunk_tiles),
+        )
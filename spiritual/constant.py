@@ -1,9 +1,19 @@
 __all__ = [
     'DEFAULT_VELOCITY', 'DEFAULT_ACCELERATION',
     'PLAYER_HITBOX',
+    'TILEMAP_MEMORY_BUDGET', 'MEMORY_BUDGETS',
 ]
 
 DEFAULT_VELOCITY = 5
 DEFAULT_ACCELERATION = 20
 
 PLAYER_HITBOX = (1, 1)
+
+TILEMAP_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# bytes per memory category, None for no budget; only the caches that can
+# rebuild their contents evict to stay under theirs
+MEMORY_BUDGETS = {
+    'scaled': 64 * 1024 * 1024,
+    'tilemaps': TILEMAP_MEMORY_BUDGET,
+}
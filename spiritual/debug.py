@@ -0,0 +1,71 @@
+from pygame.constants import SRCALPHA
+from pygame.surface import Surface
+
+from .assets import DEBUG_FONTS
+from .element import Element
+from .memory import MEMORY
+
+__all__ = ['DebugOverlay', 'format_nbytes']
+
+
+def format_nbytes(nbytes):
+    if nbytes < 1024:
+        return f'{nbytes} B'
+    for unit in ('KiB', 'MiB'):
+        nbytes /= 1024
+        if nbytes < 1024:
+            return f'{nbytes:.1f} {unit}'
+    return f'{nbytes / 1024:.1f} GiB'
+
+
+class DebugOverlay(Element):
+    # memory use per category in the top left corner, redrawn a few
+    # times a second rather than every frame
+    visible: bool = False
+    surface: Surface | None = None
+
+    refresh: float = 0.5
+    line_height: int = 16
+
+    def __init__(self, x=8, y=8, font=None, font_size=18, tracker=MEMORY):
+        self.x = x
+        self.y = y
+        self.font = DEBUG_FONTS if font is None else font
+        self.font_size = font_size
+        self.tracker = tracker
+        self.elapsed = 0.0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.elapsed = self.refresh
+
+    def update(self, window, dt):
+        if not self.visible:
+            return
+        self.elapsed += dt
+        if self.elapsed >= self.refresh:
+            self.elapsed = 0.0
+            self.surface = self.render(self.tracker.report())
+
+    def render(self, report):
+        lines = []
+        for category, entry in report.items():
+            line = f'{category:<12} {format_nbytes(entry["nbytes"]):>10}'
+            if entry['budget'] is not None:
+                line += f' / {format_nbytes(entry["budget"])}'
+            lines.append(line)
+        total = sum(entry['nbytes'] for entry in report.values())
+        lines.append(f'{"total":<12} {format_nbytes(total):>10}')
+        # not through the shared text cache, these lines change every time
+        font = self.font[self.font_size]
+        texts = [font.render(line, True, (255, 255, 255)) for line in lines]
+        surface = Surface((max(text.get_width() for text in texts) + 8,
+                           self.line_height * len(texts) + 8), SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        for i, text in enumerate(texts):
+            surface.blit(text, (4, 4 + i * self.line_height))
+        return surface
+
+    def draw(self, queue):
+        if self.visible and self.surface is not None:
+            queue.blit(self.surface, (self.x, self.y))
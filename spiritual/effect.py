@@ -0,0 +1,126 @@
+from functools import lru_cache
+
+__all__ = ['Combatant', 'parse_effect', 'compile_effect', 'compile_effects',
+           'apply_effects', 'EFFECTS']
+
+# an effect is one line of "name arg ...", e.g. "damage 4", "poison 2 3" or
+# "buff attack 1"; numbers are integers and stats are plain words
+
+
+class Combatant:
+    hp: int
+    max_hp: int
+    shield: int
+    stats: dict[str, int]
+    poison: list[list[int]]
+
+    def __init__(self, hp, stats=None):
+        self.hp = hp
+        self.max_hp = hp
+        self.shield = 0
+        self.stats = {} if stats is None else stats
+        self.poison = []
+
+    @property
+    def alive(self):
+        return self.hp > 0
+
+    def hurt(self, amount):
+        # debuffs can push damage below zero, which must not heal
+        amount = max(amount, 0)
+        absorbed = min(self.shield, amount)
+        self.shield -= absorbed
+        dealt = min(self.hp, amount - absorbed)
+        self.hp -= dealt
+        return dealt
+
+    def tick(self):
+        # poison stacks deal their damage and run out
+        for stack in self.poison:
+            self.hurt(stack[0])
+            stack[1] -= 1
+        self.poison = [stack for stack in self.poison if stack[1] > 0]
+
+
+def _damage(source, target, amount):
+    target.hurt(amount + source.stats.get('attack', 0))
+
+
+def _heal(source, target, amount):
+    source.hp = min(source.hp + amount, source.max_hp)
+
+
+def _shield(source, target, amount):
+    source.shield += amount
+
+
+def _drain(source, target, amount):
+    _heal(source, target, target.hurt(amount))
+
+
+def _poison(source, target, amount, turns):
+    target.poison.append([amount, turns])
+
+
+def _buff(source, target, stat, amount):
+    source.stats[stat] = source.stats.get(stat, 0) + amount
+
+
+def _debuff(source, target, stat, amount):
+    target.stats[stat] = target.stats.get(stat, 0) - amount
+
+
+# name: (function, argument kinds)
+EFFECTS = {
+    'damage': (_damage, (int,)),
+    'heal': (_heal, (int,)),
+    'shield': (_shield, (int,)),
+    'drain': (_drain, (int,)),
+    'poison': (_poison, (int, int)),
+    'buff': (_buff, (str, int)),
+    'debuff': (_debuff, (str, int)),
+}
+
+
+def parse_effect(text):
+    words = text.split()
+    if not words:
+        raise ValueError('empty effect')
+    name, *words = words
+    if name not in EFFECTS:
+        raise ValueError(f'unknown effect {name!r} in {text!r}')
+    function, kinds = EFFECTS[name]
+    if len(words) != len(kinds):
+        raise ValueError(f'{name} takes {len(kinds)} arguments, '
+                         f'got {len(words)} in {text!r}')
+    args = []
+    for word, kind in zip(words, kinds):
+        if kind is int:
+            try:
+                value = int(word)
+            except ValueError:
+                raise ValueError(
+                    f'expected a number, got {word!r} in {text!r}') from None
+            if value < 0:
+                raise ValueError(f'negative amount in {text!r}')
+        elif not word.isidentifier():
+            raise ValueError(f'invalid stat {word!r} in {text!r}')
+        else:
+            value = word
+        args.append(value)
+    return function, tuple(args)
+
+
+@lru_cache(maxsize=4096)
+def compile_effect(text):
+    # the same text is only parsed once while it stays in the cache
+    return parse_effect(text)
+
+
+def compile_effects(effects):
+    return tuple(compile_effect(text) for text in effects)
+
+
+def apply_effects(ops, source, target):
+    for function, args in ops:
+        function(source, target, *args)
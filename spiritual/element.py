@@ -1,23 +1,67 @@
 from pygame.constants import (
     K_BACKSPACE, K_ESCAPE, K_RETURN, KEYDOWN,
-    MOUSEBUTTONDOWN, MOUSEBUTTONUP,
+    MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEWHEEL,
 )
-from pygame.draw import rect as draw_rect
 from pygame.font import Font
 from pygame.rect import Rect
 from pygame.surface import Surface
+from pygame.surfarray import array3d, array_alpha, pixels3d, pixels_alpha
 from pygame.transform import scale as transform_scale
 
+from collections import OrderedDict
+from functools import lru_cache
+from math import ceil
+
+import numpy as np
+
 from .assets import FONTS, TITLE_FONTS
+from .memory import surface_nbytes
+
+__all__ = [
+    'Element', 'Title', 'TextPrompt', 'Button', 'ScrollList', 'Sprite',
+    'get_rect_layout', 'get_layout', 'render_text', 'render_box',
+]
+
+
+@lru_cache(maxsize=4096)
+def get_rect_layout(rect, size, default_size):
+    x_scale = size[0] / default_size[0]
+    y_scale = size[1] / default_size[1]
+    x, y, width, height = rect
+    return x * x_scale, y * y_scale, width * x_scale, height * y_scale
+
+
+@lru_cache(maxsize=4096)
+def get_layout(rect, font_size, size, default_size):
+    scale = min(size[0] / default_size[0], size[1] / default_size[1])
+    font_size = min(max(round(font_size * scale), 8), 72)
+    return get_rect_layout(rect, size, default_size), font_size
+
+
+@lru_cache(maxsize=1024)
+def render_text(font, text, color):
+    return font.render(text, True, color)
 
-__all__ = ['Element', 'Title', 'TextPrompt', 'Button']
+
+def render_box(size, color, text):
+    # a filled box with the text centered, drawn once and blitted as a whole
+    box = Surface(size)
+    box.fill(color)
+    text_rect = text.get_rect()
+    text_rect.center = (size[0] // 2, size[1] // 2)
+    box.blit(text, text_rect)
+    return box
 
 
 class Element:
+    interactive: bool = False
+    focusable: bool = False
+    focus: bool = False
+
     def update(self, window, dt):
         pass
 
-    def draw(self, screen):
+    def draw(self, queue):
         pass
 
     def on_event(self, event, window):
@@ -62,26 +106,26 @@ class Title(Element):
         self.font_color = font_color
         self.rect = Rect(x, y, width, height)
 
-    def draw(self, screen):
-        text = self.font[self.font_size].render(
-            self.text, True, self.font_color)
+    def draw(self, queue):
+        text = render_text(self.font[self.font_size], self.text,
+                           self.font_color)
         text_rect = text.get_rect()
         text_rect.center = self.rect.center
-        screen.blit(text, text_rect)
+        queue.blit(text, text_rect)
 
     def on_resize(self, size: tuple[int, int], window):
-        self.x = self.default_x * size[0] / window.default_width
-        self.y = self.default_y * size[1] / window.default_height
-        self.width = self.default_width * size[0] / window.default_width
-        self.height = self.default_height * size[1] / window.default_height
+        (self.x, self.y, self.width, self.height), self.font_size = get_layout(
+            (self.default_x, self.default_y,
+             self.default_width, self.default_height),
+            self.default_font_size, size,
+            (window.default_width, window.default_height))
         self.rect = Rect(self.x, self.y, self.width, self.height)
-        self.font_size = self.default_font_size * min(
-            size[0] / window.default_width,
-            size[1] / window.default_height)
-        self.font_size = min(max(round(self.font_size), 8), 72)
 
 
 class TextPrompt(Element):
+    interactive = True
+    focusable = True
+
     prompt: str
     x: int
     y: int
@@ -93,6 +137,7 @@ class TextPrompt(Element):
     prompt_color: tuple[int, int, int]
     rect: Rect
     max_length: int
+    box: Surface | None
 
     default_x: int
     default_y: int
@@ -123,27 +168,27 @@ class TextPrompt(Element):
 
         self.value = ''
         self.focus = False
-
-    def draw(self, screen):
-        color = tuple((c * 0.8 for c in self.prompt_color)
-                      if self.focus else self.prompt_color)
-        draw_rect(screen, color, self.rect)
-        text = self.font[self.font_size].render(
-            self.value or self.prompt, True, self.font_color)
-        text_rect = text.get_rect()
-        text_rect.center = self.rect.center
-        screen.blit(text, text_rect)
+        self.box = None
+        self.box_key = None
+
+    def draw(self, queue):
+        key = (self.rect.size, self.value or self.prompt, self.font_size,
+               self.focus)
+        if key != self.box_key:
+            color = tuple((c * 0.8 for c in self.prompt_color)
+                          if self.focus else self.prompt_color)
+            self.box = render_box(self.rect.size, color, render_text(
+                self.font[self.font_size], key[1], self.font_color))
+            self.box_key = key
+        queue.blit(self.box, self.rect)
 
     def on_resize(self, size: tuple[int, int], window):
-        self.x = self.default_x * size[0] / window.default_width
-        self.y = self.default_y * size[1] / window.default_height
-        self.width = self.default_width * size[0] / window.default_width
-        self.height = self.default_height * size[1] / window.default_height
+        (self.x, self.y, self.width, self.height), self.font_size = get_layout(
+            (self.default_x, self.default_y,
+             self.default_width, self.default_height),
+            self.default_font_size, size,
+            (window.default_width, window.default_height))
         self.rect = Rect(self.x, self.y, self.width, self.height)
-        self.font_size = self.default_font_size * min(
-            size[0] / window.default_width,
-            size[1] / window.default_height)
-        self.font_size = min(max(round(self.font_size), 8), 72)
 
     def on_event(self, event, window):
         if event.type == MOUSEBUTTONDOWN:
@@ -161,6 +206,8 @@ class TextPrompt(Element):
 
 
 class Button(Element):
+    interactive = True
+
     text: str
     x: int
     y: int
@@ -173,6 +220,7 @@ class Button(Element):
     action: callable
     rect: Rect
     pressed: bool
+    box: Surface | None
 
     default_x: int
     default_y: int
@@ -200,28 +248,29 @@ class Button(Element):
         self.action = action if action is not None else lambda window: None
         self.rect = Rect(x, y, width, height)
         self.pressed = False
-
-    def draw(self, screen):
-        color = tuple((c * 0.8 for c in self.color)
-                      if self.pressed else self.color)
-        draw_rect(screen, color, self.rect)
-        text = self.font[self.font_size].render(
-            self.text, True, tuple((c * 0.8 for c in self.font_color)
-                                   if self.pressed else self.font_color))
-        text_rect = text.get_rect()
-        text_rect.center = self.rect.center
-        screen.blit(text, text_rect)
+        self.box = None
+        self.box_key = None
+
+    def draw(self, queue):
+        # redrawn only when the look changes
+        key = (self.rect.size, self.text, self.font_size, self.pressed)
+        if key != self.box_key:
+            color = tuple((c * 0.8 for c in self.color)
+                          if self.pressed else self.color)
+            font_color = tuple((c * 0.8 for c in self.font_color)
+                               if self.pressed else self.font_color)
+            self.box = render_box(self.rect.size, color, render_text(
+                self.font[self.font_size], self.text, font_color))
+            self.box_key = key
+        queue.blit(self.box, self.rect)
 
     def on_resize(self, size: tuple[int, int], window):
-        self.x = self.default_x * size[0] / window.default_width
-        self.y = self.default_y * size[1] / window.default_height
-        self.width = self.default_width * size[0] / window.default_width
-        self.height = self.default_height * size[1] / window.default_height
+        (self.x, self.y, self.width, self.height), self.font_size = get_layout(
+            (self.default_x, self.default_y,
+             self.default_width, self.default_height),
+            self.default_font_size, size,
+            (window.default_width, window.default_height))
         self.rect = Rect(self.x, self.y, self.width, self.height)
-        self.font_size = self.default_font_size * min(
-            size[0] / window.default_width,
-            size[1] / window.default_height)
-        self.font_size = min(max(round(self.font_size), 8), 72)
 
     def on_event(self, event, window):
         if event.type == MOUSEBUTTONDOWN:
@@ -236,6 +285,93 @@ class Button(Element):
                 self.pressed = False
 
 
+class ScrollList(Element):
+    interactive = True
+
+    x: int
+    y: int
+    width: int
+    height: int
+    rect: Rect
+    rows: list[Button]
+    filled_rows: list[Button]
+    first: int
+    get_item: callable
+    action: callable
+
+    default_x: int
+    default_y: int
+    default_width: int
+    default_height: int
+
+    def __init__(self, x, y, width, row_height, row_spacing, row_count,
+                 color, get_item, font=None, font_size=24,
+                 font_color=(0, 0, 0), action=None):
+        height = row_spacing * (row_count - 1) + row_height
+        self.default_x = x
+        self.default_y = y
+        self.default_width = width
+        self.default_height = height
+
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.rect = Rect(x, y, width, height)
+        self.get_item = get_item
+        self.action = action if action is not None else (
+            lambda index, window: None)
+        self.first = 0
+        # only the visible rows exist, scrolling relabels them in place
+        self.rows = [
+            Button('', x, y + row_spacing * i, width, row_height, color,
+                   font, font_size, font_color,
+                   lambda window, row=i: self.select(row, window))
+            for i in range(row_count)
+        ]
+        self.fill_rows()
+
+    def fill_rows(self):
+        # rows past the last item are neither drawn nor pressed
+        self.filled_rows = []
+        for i, row in enumerate(self.rows):
+            item = self.get_item(self.first + i)
+            row.text = '' if item is None else item
+            if item is not None:
+                self.filled_rows.append(row)
+
+    def scroll(self, amount):
+        first = max(self.first + amount, 0)
+        while first > 0 and self.get_item(first) is None:
+            first -= 1
+        if first != self.first:
+            self.first = first
+            self.fill_rows()
+
+    def select(self, row, window):
+        self.action(self.first + row, window)
+
+    def draw(self, queue):
+        for row in self.filled_rows:
+            row.draw(queue)
+
+    def on_resize(self, size: tuple[int, int], window):
+        self.x, self.y, self.width, self.height = get_rect_layout(
+            (self.default_x, self.default_y,
+             self.default_width, self.default_height),
+            size, (window.default_width, window.default_height))
+        self.rect = Rect(self.x, self.y, self.width, self.height)
+        for row in self.rows:
+            row.on_resize(size, window)
+
+    def on_event(self, event, window):
+        if event.type == MOUSEWHEEL:
+            self.scroll(-event.y)
+            return
+        for row in self.filled_rows:
+            row.on_event(event, window)
+
+
 class Sprite(Element):
     image: Surface
     x: int
@@ -244,12 +380,15 @@ class Sprite(Element):
     height: int
     scale: float
     use_center: bool
+    scaled: OrderedDict
 
     default_x: int
     default_y: int
     default_width: int
     default_height: int
 
+    scaled_cache_size: int = 2
+
     def __init__(self, image, x, y, width, height, scale=1, use_center=False):
         self.default_x = x
         self.default_y = y
@@ -263,25 +402,80 @@ class Sprite(Element):
         self.width = width * scale
         self.height = height * scale
         self.use_center = use_center
+        self.scaled = OrderedDict()
+        self.scaled_image = image
+        self.last_scaled = None
 
     def set_pos(self, x, y):
         self.x = x
         self.y = y
 
-    def draw(self, screen):
-        wd_width, wd_height = screen.get_size()
+    def invalidate(self):
+        self.scaled.clear()
+        self.last_scaled = None
+
+    def update_region(self, rect):
+        # copies one changed region of the image into the cached sizes
+        # instead of dropping them, picking the same source pixel for every
+        # scaled pixel as transform.scale does
+        if self.scaled_image is not self.image:
+            return
+        x, y, width, height = rect
+        image_width, image_height = self.image.get_size()
+        region = self.image.subsurface(rect)
+        colors = array3d(region)
+        alphas = array_alpha(region)
+        for scaled in self.scaled.values():
+            scaled_width, scaled_height = scaled.get_size()
+            left = ceil(x * scaled_width / image_width)
+            top = ceil(y * scaled_height / image_height)
+            right = ceil((x + width) * scaled_width / image_width)
+            bottom = ceil((y + height) * scaled_height / image_height)
+            source = (
+                np.arange(left, right)[:, None] * image_width // scaled_width
+                - x,
+                np.arange(top, bottom) * image_height // scaled_height - y,
+            )
+            pixels3d(scaled)[left:right, top:bottom] = colors[source]
+            pixels_alpha(scaled)[left:right, top:bottom] = alphas[source]
+
+    def get_nbytes(self):
+        return sum(surface_nbytes(image) for image in self.scaled.values())
+
+    def get_scaled(self):
+        # keep the last few sizes so toggling between them is free
+        if self.scaled_image is not self.image:
+            self.scaled.clear()
+            self.scaled_image = self.image
+        size = (self.width, self.height)
+        if size in self.scaled:
+            self.scaled.move_to_end(size)
+        else:
+            self.scaled[size] = transform_scale(self.image, size)
+            while len(self.scaled) > self.scaled_cache_size:
+                self.scaled.popitem(last=False)
+        self.last_scaled = (self.image, self.width, self.height,
+                            self.scaled[size])
+        return self.scaled[size]
+
+    def draw(self, queue):
+        wd_width, wd_height = queue.get_size()
         if self.x + self.width < 0 or self.x > wd_width:
             return
         if self.y + self.height < 0 or self.y > wd_height:
             return
-        transformed = transform_scale(
-            self.image, (self.width, self.height),
-        )
+        # most frames draw the same size as the last one
+        last = self.last_scaled
+        if (last is not None and last[0] is self.image
+                and last[1] == self.width and last[2] == self.height):
+            transformed = last[3]
+        else:
+            transformed = self.get_scaled()
         if self.use_center:
-            screen.blit(transformed,
-                        (self.x - self.width / 2, self.y - self.height / 2))
+            queue.blit(transformed,
+                       (self.x - self.width / 2, self.y - self.height / 2))
         else:
-            screen.blit(transformed, (self.x, self.y))
+            queue.blit(transformed, (self.x, self.y))
 
     def on_resize(self, size: tuple[int, int], window):
         self.x = self.default_x * size[0] / window.default_width
@@ -0,0 +1,147 @@
+from .item import Item
+from .myjson import build_value, skip_value
+from .smartdata import SmartData
+
+__all__ = ['Inventory']
+
+
+def _item_name(item):
+    return item.name if isinstance(item, Item) else item
+
+
+def _is_legacy_item(item):
+    return isinstance(item, str) or (
+        isinstance(item, dict) and Item.is_valid(item))
+
+
+class Inventory(SmartData):
+    counts: dict[str, int]
+
+    def __init__(self, *args, **kwargs):
+        if not args and 'counts' not in kwargs:
+            kwargs['counts'] = {}
+        super().__init__(*args, **kwargs)
+        self.listeners = []
+
+    @classmethod
+    def is_valid(cls, obj):
+        # profiles saved before inventories were counted hold a flat list
+        # of item names or items
+        if isinstance(obj, list):
+            return all(_is_legacy_item(item) for item in obj)
+        return (isinstance(obj, dict) and super().is_valid(obj)
+                and all(count > 0 for count in obj['counts'].values()))
+
+    @classmethod
+    def check_stream(cls, events, event, value):
+        # is_valid without building the counts of a large inventory
+        if event == 'start_array':
+            for event, value in events:
+                if event == 'end_array':
+                    return True
+                if not _is_legacy_item(build_value(events, event, value)):
+                    return False
+            return False
+        if event != 'start_map':
+            return False
+        found = False
+        for event, key in events:
+            if event == 'end_map':
+                return found
+            event, value = next(events)
+            if key != 'counts':
+                skip_value(events, event)
+                continue
+            if event != 'start_map':
+                return False
+            for event, name in events:
+                if event == 'end_map':
+                    break
+                event, count = next(events)
+                if event != 'value' or not isinstance(count, int) or count <= 0:
+                    return False
+            found = True
+        return False
+
+    @classmethod
+    def loads(cls, obj):
+        if not isinstance(obj, list):
+            return super().loads(obj)
+        inventory = cls()
+        inventory.add_many(item if isinstance(item, str) else item['name']
+                           for item in obj)
+        return inventory
+
+    def dumps(self):
+        return {'counts': {**self.counts}}
+
+    def __contains__(self, item):
+        return _item_name(item) in self.counts
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def has(self, item, amount=1):
+        return self.counts.get(_item_name(item), 0) >= amount
+
+    def count(self, item):
+        return self.counts.get(_item_name(item), 0)
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def subscribe(self, listener):
+        # listener(name, count) is called after every change
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def set_count(self, name, count):
+        if count:
+            self.counts[name] = count
+        else:
+            self.counts.pop(name, None)
+        for listener in self.listeners:
+            listener(name, count)
+
+    def add(self, item, amount=1):
+        if amount < 0:
+            raise ValueError(f'invalid amount {amount}')
+        if amount:
+            name = _item_name(item)
+            self.set_count(name, self.counts.get(name, 0) + amount)
+
+    def remove(self, item, amount=1):
+        if amount < 0:
+            raise ValueError(f'invalid amount {amount}')
+        name = _item_name(item)
+        count = self.counts.get(name, 0)
+        if count < amount:
+            raise ValueError(f'not enough {name}: {count} < {amount}')
+        if amount:
+            self.set_count(name, count - amount)
+
+    def add_many(self, items):
+        # a mapping of amounts or an iterable of single items
+        if isinstance(items, dict):
+            amounts = items
+        else:
+            amounts = {}
+            for item in items:
+                name = _item_name(item)
+                amounts[name] = amounts.get(name, 0) + 1
+        for name, amount in amounts.items():
+            self.add(name, amount)
+
+    def remove_many(self, amounts):
+        # all or nothing
+        for name, amount in amounts.items():
+            if not self.has(name, amount):
+                raise ValueError(f'not enough {_item_name(name)}: '
+                                 f'{self.count(name)} < {amount}')
+        for name, amount in amounts.items():
+            self.remove(name, amount)
@@ -0,0 +1,139 @@
+from array import array
+from json import dumps as json_dumps, loads as json_loads
+from math import ceil
+from struct import Struct
+from sys import byteorder
+
+__all__ = ['MAGIC', 'MapFile', 'encode', 'write']
+
+# layout: MAGIC, header length, JSON header, then one run-length encoded
+# block of (palette index, run) uint16 pairs per chunk, columns first
+MAGIC = b'SPMAP\x01'
+HEADER_LENGTH = Struct('<I')
+
+
+def _to_bytes(runs: array) -> bytes:
+    if byteorder == 'big':
+        runs = array('H', runs)
+        runs.byteswap()
+    return runs.tobytes()
+
+
+def _from_bytes(data: bytes) -> array:
+    runs = array('H')
+    runs.frombytes(data)
+    if byteorder == 'big':
+        runs.byteswap()
+    return runs
+
+
+def _encode_chunk(tilemap, palette_index, x, y, chunk_size):
+    runs = array('H')
+    current = None
+    length = 0
+    for column in tilemap[x:x + chunk_size]:
+        for tile in column[y:y + chunk_size]:
+            index = palette_index[tile]
+            if index == current:
+                length += 1
+                continue
+            if current is not None:
+                runs.append(current)
+                runs.append(length)
+            current = index
+            length = 1
+    if current is not None:
+        runs.append(current)
+        runs.append(length)
+    return _to_bytes(runs)
+
+
+def encode(tilemap: list[list[str]], sources: dict[str, str],
+           chunk_size: int = 16) -> bytes:
+    if not 0 < chunk_size < 256:
+        raise ValueError(f'invalid chunk size {chunk_size}')
+    if not tilemap or not tilemap[0]:
+        raise ValueError('empty tilemap')
+    width, height = len(tilemap), len(tilemap[0])
+    palette = sorted({tile for column in tilemap for tile in column})
+    if len(palette) > 0xffff:
+        raise ValueError('too many tile types')
+    palette_index = {tile: index for index, tile in enumerate(palette)}
+
+    chunks = []
+    offsets = []
+    offset = 0
+    for x in range(0, width, chunk_size):
+        for y in range(0, height, chunk_size):
+            chunk = _encode_chunk(tilemap, palette_index, x, y, chunk_size)
+            chunks.append(chunk)
+            offsets.append([offset, len(chunk)])
+            offset += len(chunk)
+
+    header = json_dumps({
+        'size': [width, height],
+        'chunk_size': chunk_size,
+        'palette': palette,
+        'sources': sources,
+        'chunks': offsets,
+    }, separators=(',', ':')).encode()
+    return b''.join((MAGIC, HEADER_LENGTH.pack(len(header)), header, *chunks))
+
+
+def write(file, tilemap: list[list[str]], sources: dict[str, str],
+          chunk_size: int = 16):
+    file.write(encode(tilemap, sources, chunk_size))
+
+
+class MapFile:
+    size: tuple[int, int]
+    chunk_size: int
+    palette: list[str]
+    sources: dict[str, str]
+
+    def __init__(self, file):
+        self.file = file
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('not a tilemap file')
+        (header_length,) = HEADER_LENGTH.unpack(
+            file.read(HEADER_LENGTH.size))
+        header = json_loads(file.read(header_length))
+        self.size = tuple(header['size'])
+        self.chunk_size = header['chunk_size']
+        self.palette = header['palette']
+        self.sources = header['sources']
+        self.offsets = header['chunks']
+        self.data_start = len(MAGIC) + HEADER_LENGTH.size + header_length
+
+    def get_chunk_count(self):
+        return (ceil(self.size[0] / self.chunk_size),
+                ceil(self.size[1] / self.chunk_size))
+
+    def get_chunk_size(self, x, y):
+        return (min(self.chunk_size, self.size[0] - x * self.chunk_size),
+                min(self.chunk_size, self.size[1] - y * self.chunk_size))
+
+    def read_chunk(self, x, y) -> list[list[str]]:
+        chunks_x, chunks_y = self.get_chunk_count()
+        if not (0 <= x < chunks_x and 0 <= y < chunks_y):
+            raise IndexError(f'chunk {(x, y)} out of range')
+        offset, length = self.offsets[x * chunks_y + y]
+        self.file.seek(self.data_start + offset)
+        runs = _from_bytes(self.file.read(length))
+
+        width, height = self.get_chunk_size(x, y)
+        cells = []
+        for i in range(0, len(runs), 2):
+            cells += [self.palette[runs[i]]] * runs[i + 1]
+        if len(cells) != width * height:
+            raise ValueError(f'corrupt chunk {(x, y)}')
+        return [cells[i:i + height] for i in range(0, len(cells), height)]
+
+    def read_grid(self) -> list[list[str]]:
+        chunks_x, chunks_y = self.get_chunk_count()
+        grid = [[] for _ in range(self.size[0])]
+        for x in range(chunks_x):
+            for y in range(chunks_y):
+                for i, column in enumerate(self.read_chunk(x, y)):
+                    grid[x * self.chunk_size + i] += column
+        return grid
@@ -0,0 +1,106 @@
+from json import dump as json_dump
+from sys import getsizeof
+
+from .constant import MEMORY_BUDGETS
+
+__all__ = [
+    'CATEGORIES', 'MemoryTracker', 'MEMORY', 'surface_nbytes', 'deep_nbytes',
+]
+
+CATEGORIES = ('fonts', 'tile_images', 'chunks', 'scaled', 'tilemaps',
+              'profile')
+
+
+def surface_nbytes(surface):
+    # subsurfaces share the pixels of their parent
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+
+def deep_nbytes(obj, seen=None):
+    if seen is None:
+        seen = {*()}
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getsizeof(obj)
+    if isinstance(obj, dict):
+        nbytes += sum(deep_nbytes(key, seen) + deep_nbytes(value, seen)
+                      for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        nbytes += sum(deep_nbytes(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        nbytes += deep_nbytes(vars(obj), seen)
+    return nbytes
+
+
+class MemoryTracker:
+    # every category sums the sources registered for it, a source is
+    # measure() -> bytes and optionally evict(nbytes), which shrinks it to
+    # at most nbytes where it can, and set_budget(budget) for sources that
+    # keep a budget of their own
+    sources: dict[str, dict[str, tuple]]
+    budgets: dict[str, int | None]
+
+    def __init__(self, budgets=None):
+        self.sources = {category: {} for category in CATEGORIES}
+        self.budgets = {category: None for category in CATEGORIES}
+        self.budgets.update(budgets or {})
+
+    def register(self, category, name, measure, evict=None,
+                 set_budget=None):
+        if category not in self.sources:
+            raise ValueError(f'unknown memory category {category}')
+        self.sources[category][name] = (measure, evict, set_budget)
+        if set_budget is not None:
+            set_budget(self.budgets[category])
+
+    def unregister(self, category, name):
+        self.sources[category].pop(name, None)
+
+    def measure(self, category):
+        return sum(measure() for measure, *_ in
+                   self.sources[category].values())
+
+    def set_budget(self, category, budget):
+        if category not in self.budgets:
+            raise ValueError(f'unknown memory category {category}')
+        self.budgets[category] = budget
+        for _, _, set_source_budget in self.sources[category].values():
+            if set_source_budget is not None:
+                set_source_budget(budget)
+        self.enforce(category)
+
+    def enforce(self, *categories):
+        for category in categories or self.sources:
+            budget = self.budgets[category]
+            if budget is None:
+                continue
+            total = self.measure(category)
+            for measure, evict, _ in self.sources[category].values():
+                if total <= budget:
+                    break
+                if evict is None:
+                    continue
+                before = measure()
+                evict(max(before - (total - budget), 0))
+                total -= before - measure()
+
+    def report(self):
+        report = {}
+        for category, sources in self.sources.items():
+            nbytes = {name: measure()
+                      for name, (measure, *_) in sources.items()}
+            report[category] = {
+                'nbytes': sum(nbytes.values()),
+                'budget': self.budgets[category],
+                'sources': nbytes,
+            }
+        return report
+
+    def dump(self, file):
+        json_dump(self.report(), file, indent=2)
+
+
+MEMORY = MemoryTracker(MEMORY_BUDGETS)
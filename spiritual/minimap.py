@@ -0,0 +1,110 @@
+from pygame.constants import SRCALPHA
+from pygame.surface import Surface
+from pygame.surfarray import blit_array
+from pygame.transform import average_color
+
+from itertools import chain
+from math import ceil
+
+import numpy as np
+
+from .element import Element
+from .tilemap import TILE_IDS, TILES
+
+__all__ = ['TileColors', 'Minimap', 'TILE_COLORS']
+
+
+class TileColors(dict):
+    # one color per tile type, the average of its image
+    def __missing__(self, tile):
+        image = TILES[tile]
+        color = average_color(image)
+        if not image.get_flags() & SRCALPHA:
+            # the alpha of an image without an alpha channel reads as 0
+            color = (*color[:3], 255)
+        self[tile] = color
+        return color
+
+
+TILE_COLORS = TileColors()
+
+
+class Minimap(Element):
+    # the whole location downsampled into one surface, built once per
+    # location; tile edits only refill the block of pixels they fall in
+    index: dict[str, int]
+    colors: np.ndarray
+    indices: np.ndarray
+    surface: Surface | None = None
+    player: tuple[float, float] = (0, 0)
+
+    max_width: int = 160
+    max_height: int = 120
+    margin: int = 8
+    background: tuple[int, int, int] = (40, 40, 40)
+    marker_color: tuple[int, int, int] = (255, 48, 48)
+
+    def __init__(self):
+        # index 0 is the background around the map
+        self.index = {tile: i + 1 for i, tile in enumerate(TILE_IDS)}
+        self.step = 1
+        self.scale = 1
+        self.marker = Surface((3, 3))
+
+    def get_color(self, tile):
+        # transparent tiles blend into the background
+        *rgb, alpha = TILE_COLORS[tile]
+        return [(c * alpha + b * (255 - alpha)) / 255
+                for c, b in zip(rgb, self.background)]
+
+    def set_tilemap(self, tilemap):
+        self.colors = np.array([self.background] + [
+            self.get_color(tile) for tile in TILE_IDS], np.float32)
+        width, height = tilemap.get_size()
+        self.step = step = max(1, ceil(width / self.max_width),
+                               ceil(height / self.max_height))
+        blocks = (ceil(width / step), ceil(height / step))
+        self.scale = max(1, min(self.max_width // blocks[0],
+                                self.max_height // blocks[1]))
+        self.indices = np.zeros((blocks[0] * step, blocks[1] * step),
+                                np.uint8)
+        self.indices[:width, :height] = np.fromiter(
+            map(self.index.__getitem__, chain.from_iterable(tilemap.tilemap)),
+            np.uint8, width * height).reshape(width, height)
+
+        # per block the number of tiles of each type, weighting the colors
+        counts = np.stack([
+            (self.indices == i).reshape(
+                blocks[0], step, blocks[1], step).sum(axis=(1, 3))
+            for i in range(len(self.colors))], -1)
+        pixels = np.rint(counts @ self.colors / step ** 2).astype(np.uint8)
+        pixels = pixels.repeat(self.scale, 0).repeat(self.scale, 1)
+        self.surface = Surface(pixels.shape[:2])
+        blit_array(self.surface, pixels)
+        self.marker = Surface((max(3, self.scale), max(3, self.scale)))
+        self.marker.fill(self.marker_color)
+
+    def set_tile(self, x, y, tile):
+        index = self.index[tile]
+        if self.indices[x, y] == index:
+            return
+        self.indices[x, y] = index
+        x, y = x // self.step, y // self.step
+        block = self.indices[x * self.step:(x + 1) * self.step,
+                             y * self.step:(y + 1) * self.step]
+        color = np.rint(self.colors[block].mean(axis=(0, 1)))
+        self.surface.fill(color.astype(int).tolist(),
+                          (x * self.scale, y * self.scale,
+                           self.scale, self.scale))
+
+    def draw(self, queue):
+        if self.surface is None:
+            return
+        x = queue.get_size()[0] - self.surface.get_width() - self.margin
+        y = self.margin
+        queue.blit(self.surface, (x, y))
+        pixels = self.scale / self.step
+        queue.blit(self.marker, (
+            x + (self.player[0] + 0.5) * pixels - self.marker.get_width() / 2,
+            y + (self.player[1] + 0.5) * pixels - self.marker.get_height() / 2,
+        ))
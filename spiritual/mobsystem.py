@@ -0,0 +1,146 @@
+from math import ceil
+
+import numpy as np
+
+from .constant import DEFAULT_ACCELERATION, DEFAULT_VELOCITY
+from .mob import Mob
+from .tilemap import COLLISSION_TILES, Tilemap
+
+__all__ = ['MobSystem']
+
+
+class MobSystem:
+    tilemap: Tilemap
+    mobs: list[Mob]
+    count: int
+
+    positions: np.ndarray
+    velocities: np.ndarray
+    directions: np.ndarray
+    hitboxes: np.ndarray
+    max_velocities: np.ndarray
+    accelerations: np.ndarray
+
+    fields = {
+        'positions': (2, np.float64),
+        'velocities': (2, np.float64),
+        'directions': (2, np.int8),
+        'hitboxes': (2, np.float64),
+        'max_velocities': (1, np.float64),
+        'accelerations': (1, np.float64),
+    }
+
+    def __init__(self, tilemap, capacity=64):
+        self.tilemap = tilemap
+        self.mobs = []
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # one row per mob, the first self.count rows are live
+        for name, (width, dtype) in self.fields.items():
+            array = np.zeros((capacity, width), dtype)
+            if self.count:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+    def spawn(self, mob, position, hitbox=(1, 1),
+              max_velocity=DEFAULT_VELOCITY,
+              acceleration=DEFAULT_ACCELERATION):
+        if self.count == len(self.positions):
+            self.allocate(len(self.positions) * 2)
+        index = self.count
+        self.mobs.append(mob)
+        self.positions[index] = position
+        self.velocities[index] = 0
+        self.directions[index] = 0
+        self.hitboxes[index] = hitbox
+        self.max_velocities[index] = max_velocity
+        self.accelerations[index] = acceleration
+        self.count += 1
+        return index
+
+    def despawn(self, index):
+        # the last mob takes over the freed row
+        last = self.count - 1
+        for name in self.fields:
+            array = getattr(self, name)
+            array[index] = array[last]
+        self.mobs[index] = self.mobs[last]
+        self.mobs.pop()
+        self.count -= 1
+
+    def collides(self, x, y):
+        mask = self.tilemap.get_mask()
+        width, height = mask.shape
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        result = np.full(x.shape, 'empty' in COLLISSION_TILES)
+        result[inside] = mask[x[inside], y[inside]]
+        return result
+
+    def accelerate(self, dt):
+        count = self.count
+        velocities = self.velocities[:count]
+        directions = self.directions[:count]
+        max_velocities = self.max_velocities[:count]
+        step = self.accelerations[:count] * dt
+
+        slowed = np.where(np.abs(velocities) < step, 0,
+                          velocities - np.sign(velocities) * step)
+        driven = np.clip(velocities + directions * step,
+                         -max_velocities, max_velocities)
+        velocities[:] = np.where(directions == 0, slowed, driven)
+
+    @staticmethod
+    def edge_tile(edge, forward):
+        # the tile an edge lies in, an edge on a tile border belongs to
+        # the tile behind it; the tolerance absorbs rounding after a stop
+        return np.where(forward, np.ceil(edge - 1e-9) - 1,
+                        np.floor(edge + 1e-9)).astype(np.int64)
+
+    def move_axis(self, axis, dt):
+        # moves along one axis and stops at the first colliding tile,
+        # tick keeps every step within one tile
+        count = self.count
+        positions = self.positions[:count]
+        velocities = self.velocities[:count, axis]
+        half = self.hitboxes[:count, axis] / 2
+        other = positions[:, 1 - axis]
+        other_half = self.hitboxes[:count, 1 - axis] / 2
+
+        old = positions[:, axis]
+        new = old + velocities * dt
+        forward = velocities > 0
+        old_edge = np.where(forward, old + half, old - half)
+        new_edge = np.where(forward, new + half, new - half)
+        old_tile = self.edge_tile(old_edge, forward)
+        new_tile = self.edge_tile(new_edge, forward)
+        crossing = new_tile != old_tile
+        target = old_tile + np.where(forward, 1, -1)
+
+        low = self.edge_tile(other - other_half, False)
+        high = self.edge_tile(other + other_half, True)
+        blocked = np.zeros(count, bool)
+        for offset in range(int((high - low).max(initial=0)) + 1):
+            lane = np.minimum(low + offset, high)
+            if axis == 0:
+                blocked |= self.collides(target, lane)
+            else:
+                blocked |= self.collides(lane, target)
+        blocked &= crossing
+
+        stop = np.where(forward, target - half, target + 1 + half)
+        positions[:, axis] = np.where(blocked, stop, new)
+        velocities[blocked] = 0
+
+    def tick(self, dt):
+        if self.count == 0:
+            return
+        self.accelerate(dt)
+        # a long frame is split into steps of at most one tile, so no mob
+        # passes through a wall
+        speed = np.abs(self.velocities[:self.count]).max()
+        steps = max(1, ceil(speed * dt))
+        for _ in range(steps):
+            self.move_axis(0, dt / steps)
+            self.move_axis(1, dt / steps)
@@ -1,4 +1,5 @@
+from .decoder import build_value, parse, skip_value
 from .encoder import dumps, dump
 
 
-__all__ = ['dumps', 'dump']
+__all__ = ['dumps', 'dump', 'parse', 'build_value', 'skip_value']
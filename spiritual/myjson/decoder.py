@@ -0,0 +1,138 @@
+from json.decoder import scanstring
+from re import VERBOSE, compile as re_compile
+
+__all__ = ['parse', 'build_value', 'skip_value']
+
+# parse() yields (event, value) pairs:
+#   ('start_map', None), ('map_key', key), ('end_map', None),
+#   ('start_array', None), ('end_array', None), ('value', scalar)
+# only the current chunk and the open containers are held in memory
+
+TOKEN = re_compile(r'''[ \t\n\r]*(?:
+    (?P<punct>[{}\[\],:])
+   |(?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+   |(?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)
+   |(?P<literal>true|false|null|NaN|Infinity|-Infinity)
+)''', VERBOSE)
+TOKEN_START = frozenset('{}[],:"-0123456789tfnNI')
+NUMBER_TAIL = frozenset('.eE+-0123456789')
+LITERALS = {
+    'true': True, 'false': False, 'null': None,
+    'NaN': float('nan'), 'Infinity': float('inf'),
+    '-Infinity': float('-inf'),
+}
+CLOSE = {'map': '}', 'array': ']'}
+
+
+def _tokens(file, chunk_size):
+    buffer = ''
+    pos = 0
+    final = False
+    while True:
+        match = TOKEN.match(buffer, pos)
+        # a number near the end of the chunk may continue in the next one
+        if match is not None and not (
+                not final and match.lastgroup == 'number'
+                and len(buffer) - match.end() <= 2
+                and NUMBER_TAIL.issuperset(buffer[match.end():])):
+            yield match.lastgroup, match.group(match.lastgroup)
+            pos = match.end()
+            continue
+        rest = buffer[pos:].lstrip(' \t\n\r')
+        if rest and rest[0] not in TOKEN_START:
+            raise ValueError(f'unexpected character {rest[0]!r}')
+        if final:
+            if rest:
+                raise ValueError(f'invalid JSON near {rest[:20]!r}')
+            return
+        chunk = file.read(chunk_size)
+        final = not chunk
+        buffer = rest + chunk
+        pos = 0
+
+
+def _scalar(kind, token):
+    if kind == 'string':
+        return scanstring(token, 1)[0]
+    elif kind == 'literal':
+        return LITERALS[token]
+    elif '.' in token or 'e' in token or 'E' in token:
+        return float(token)
+    return int(token)
+
+
+def parse(file, chunk_size=65536):
+    stack = []
+    # value, key, colon, next (a comma or the end of a container) or done
+    state = 'value'
+    opened = False
+    for kind, token in _tokens(file, chunk_size):
+        if state == 'done':
+            raise ValueError('extra data after the document')
+        punct = token if kind == 'punct' else None
+        if state == 'colon':
+            if punct != ':':
+                raise ValueError(f'expected ":", got {token!r}')
+            state = 'value'
+            continue
+        if state == 'next' or (opened and punct == CLOSE[stack[-1]]):
+            opened = False
+            if punct == ',':
+                state = 'key' if stack[-1] == 'map' else 'value'
+                continue
+            if punct != CLOSE[stack[-1]]:
+                raise ValueError(f'expected "," or {CLOSE[stack[-1]]!r}, '
+                                 f'got {token!r}')
+            yield f'end_{stack.pop()}', None
+            state = 'next' if stack else 'done'
+            continue
+        opened = False
+        if state == 'key':
+            if kind != 'string':
+                raise ValueError(f'expected a key, got {token!r}')
+            yield 'map_key', _scalar(kind, token)
+            state = 'colon'
+        elif punct == '{' or punct == '[':
+            stack.append('map' if punct == '{' else 'array')
+            yield f'start_{stack[-1]}', None
+            state = 'key' if punct == '{' else 'value'
+            opened = True
+        elif punct is not None:
+            raise ValueError(f'expected a value, got {token!r}')
+        else:
+            yield 'value', _scalar(kind, token)
+            state = 'next' if stack else 'done'
+    if state != 'done':
+        raise ValueError('unexpected end of the document')
+
+
+def build_value(events, event, value):
+    # the value starting with the given event, read from the events
+    if event == 'value':
+        return value
+    elif event == 'start_map':
+        result = {}
+        for event, key in events:
+            if event == 'end_map':
+                return result
+            result[key] = build_value(events, *next(events))
+    elif event == 'start_array':
+        result = []
+        for event, value in events:
+            if event == 'end_array':
+                return result
+            result.append(build_value(events, event, value))
+    raise ValueError(f'unexpected event {event}')
+
+
+def skip_value(events, event):
+    if event == 'value':
+        return
+    depth = 1
+    for event, _ in events:
+        if event == 'start_map' or event == 'start_array':
+            depth += 1
+        elif event == 'end_map' or event == 'end_array':
+            depth -= 1
+            if depth == 0:
+                return
@@ -1,5 +1,6 @@
 from decimal import Context
 from math import isinf, isnan
+from re import compile as re_compile
 
 
 NoneType = type(None)
@@ -8,9 +9,23 @@ ctx = Context()
 ctx.prec = 20
 
 
+ESCAPE = re_compile(r'[\x00-\x1f"\\]')
+ESCAPES = {
+    '"': '\\"', '\\': '\\\\',
+    '\b': '\\b', '\f': '\\f', '\n': '\\n', '\r': '\\r', '\t': '\\t',
+}
+
+
+def _escape(match):
+    char = match.group()
+    return ESCAPES.get(char) or f'\\u{ord(char):04x}'
+
+
 def _float_to_str(f):
     d1 = ctx.create_decimal(repr(f))
-    return format(d1, 'f')
+    result = format(d1, 'f')
+    # integral floats keep a fraction so they load as floats again
+    return result if '.' in result else result + '.0'
 
 
 def _dumps(obj, /, *, current_indent=0, current_width=0,
@@ -29,15 +44,7 @@ def _dumps(obj, /, *, current_indent=0, current_width=0,
         else:
             return f'{obj}'
     elif isinstance(obj, str):
-        result = ''
-        for char in obj:
-            if char == '"':
-                result += '\\"'
-            elif char in {'\b', '\f', '\n', '\r', '\t', '\v', '\\'}:
-                result += f'{char!r}'
-            else:
-                result += char
-        return f'"{result}"'
+        return f'"{ESCAPE.sub(_escape, obj)}"'
     elif isinstance(obj, tuple):
         return _dumps([*obj], current_indent=current_indent,
                       current_width=current_width, indent=indent,
@@ -0,0 +1,325 @@
+from collections import OrderedDict
+from heapq import heappop, heappush
+from math import floor, sqrt
+
+import numpy as np
+
+from .tilemap import Tilemap
+
+__all__ = ['FlowField', 'Pathfinder']
+
+SQRT2 = sqrt(2)
+
+DIRECTIONS = (
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (1, -1), (-1, 1), (-1, -1),
+)
+
+
+def octile(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+class FlowField:
+    target: tuple[int, int]
+    origin: tuple[int, int]
+    distances: np.ndarray
+    directions: np.ndarray
+
+    def __init__(self, mask, target, radius=None):
+        # only the square of the given radius around the target is solved
+        width, height = mask.shape
+        if radius is None:
+            x_min, y_min, x_max, y_max = 0, 0, width, height
+        else:
+            x_min = max(target[0] - radius, 0)
+            y_min = max(target[1] - radius, 0)
+            x_max = min(target[0] + radius + 1, width)
+            y_max = min(target[1] + radius + 1, height)
+        self.target = target
+        self.origin = (x_min, y_min)
+        walkable = ~mask[x_min:x_max, y_min:y_max]
+        self.distances = self.solve(
+            walkable, (target[0] - x_min, target[1] - y_min))
+        self.directions = self.descend(walkable, self.distances)
+
+    @staticmethod
+    def shifted(array, dx, dy, fill):
+        # result[x, y] = array[x + dx, y + dy]
+        result = np.full(array.shape, fill, array.dtype)
+        width, height = array.shape
+        result[max(-dx, 0):width - max(dx, 0),
+               max(-dy, 0):height - max(dy, 0)] = array[
+            max(dx, 0):width - max(-dx, 0),
+            max(dy, 0):height - max(-dy, 0)]
+        return result
+
+    @classmethod
+    def get_moves(cls, walkable):
+        # a diagonal move needs both orthogonal neighbours to be open
+        moves = []
+        for dx, dy in DIRECTIONS:
+            allowed = walkable & cls.shifted(walkable, dx, dy, False)
+            if dx and dy:
+                allowed &= cls.shifted(walkable, dx, 0, False)
+                allowed &= cls.shifted(walkable, 0, dy, False)
+            moves.append((dx, dy, SQRT2 if dx and dy else 1.0, allowed))
+        return moves
+
+    @staticmethod
+    def solve(walkable, target):
+        width, height = walkable.shape
+        if not (0 <= target[0] < width and 0 <= target[1] < height):
+            return np.full(walkable.shape, np.inf)
+        # flat indices into a grid padded with a blocked border, so
+        # neighbour lookups never leave the array
+        stride = height + 2
+        padded = np.zeros((width + 2, stride), bool)
+        padded[1:-1, 1:-1] = walkable
+        open_cells = padded.ravel()
+        distances = np.full(open_cells.shape, np.inf)
+        start = (target[0] + 1) * stride + target[1] + 1
+        frontier = np.array([start] if open_cells[start] else [], np.int64)
+        distances[frontier] = 0
+
+        # only the cells improved last round are expanded
+        while frontier.size:
+            cells = []
+            values = []
+            for dx, dy in DIRECTIONS:
+                allowed = open_cells[frontier + dx * stride + dy]
+                if dx and dy:
+                    allowed &= open_cells[frontier + dx * stride]
+                    allowed &= open_cells[frontier + dy]
+                source = frontier[allowed]
+                neighbor = source + dx * stride + dy
+                value = distances[source] + (SQRT2 if dx and dy else 1.0)
+                better = value < distances[neighbor]
+                cells.append(neighbor[better])
+                values.append(value[better])
+            cells = np.concatenate(cells)
+            values = np.concatenate(values)
+            np.minimum.at(distances, cells, values)
+            frontier = np.unique(cells[values == distances[cells]])
+        return distances.reshape(width + 2, stride)[1:-1, 1:-1].copy()
+
+    @classmethod
+    def descend(cls, walkable, distances):
+        directions = np.zeros((*walkable.shape, 2), np.int8)
+        best = distances.copy()
+        for dx, dy, cost, allowed in cls.get_moves(walkable):
+            candidate = np.where(
+                allowed, cls.shifted(distances, dx, dy, np.inf), np.inf)
+            better = candidate < best
+            best[better] = candidate[better]
+            directions[better] = (dx, dy)
+        return directions
+
+    def direction(self, x, y):
+        i = x - self.origin[0]
+        j = y - self.origin[1]
+        if not (0 <= i < self.directions.shape[0]
+                and 0 <= j < self.directions.shape[1]):
+            return (0, 0)
+        dx, dy = self.directions[i, j]
+        return (int(dx), int(dy))
+
+    def sample(self, positions):
+        # directions for an (n, 2) array of positions, (0, 0) outside
+        tiles = np.floor(positions).astype(np.int64) - self.origin
+        inside = ((tiles >= 0) & (tiles < self.directions.shape[:2])).all(1)
+        result = np.zeros((len(positions), 2), np.int8)
+        result[inside] = self.directions[tiles[inside, 0], tiles[inside, 1]]
+        return result
+
+
+class Pathfinder:
+    tilemap: Tilemap
+    cache_size: int = 256
+    field_cache_size: int = 4
+
+    def __init__(self, tilemap, radius=64):
+        self.tilemap = tilemap
+        self.radius = radius
+        self.version = tilemap.version
+        self.paths = OrderedDict()
+        self.fields = OrderedDict()
+        self.grid = None
+        self.stride = None
+
+    def check_version(self):
+        # any tile edit invalidates every cached result
+        if self.version != self.tilemap.version:
+            self.version = self.tilemap.version
+            self.paths.clear()
+            self.fields.clear()
+            self.grid = None
+
+    def get_grid(self):
+        # open tiles as a flat padded byte string, (x, y) lives at
+        # (x + 1) * stride + y + 1 and the border is always blocked
+        if self.grid is None:
+            self.grid = np.pad(~self.tilemap.get_mask(), 1).tobytes()
+            self.stride = self.tilemap.get_size()[1] + 2
+        return self.grid
+
+    def find_path(self, start, goal):
+        self.check_version()
+        key = (start, goal)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+        else:
+            self.paths[key] = self.search(start, goal)
+            while len(self.paths) > self.cache_size:
+                self.paths.popitem(last=False)
+        path = self.paths[key]
+        return None if path is None else [*path]
+
+    def flow_field(self, target):
+        self.check_version()
+        if target in self.fields:
+            self.fields.move_to_end(target)
+        else:
+            self.fields[target] = FlowField(
+                self.tilemap.get_mask(), target, self.radius)
+            while len(self.fields) > self.field_cache_size:
+                self.fields.popitem(last=False)
+        return self.fields[target]
+
+    def flow_field_at(self, position):
+        return self.flow_field((floor(position[0]), floor(position[1])))
+
+    def search(self, start, goal):
+        # A* over jump points, diagonal moves never cut corners
+        grid = self.get_grid()
+        stride = self.stride
+        width, height = self.tilemap.get_size()
+        if not (0 <= start[0] < width and 0 <= start[1] < height
+                and 0 <= goal[0] < width and 0 <= goal[1] < height):
+            return None
+        start = (start[0] + 1) * stride + start[1] + 1
+        goal = (goal[0] + 1) * stride + goal[1] + 1
+        if not grid[start] or not grid[goal]:
+            return None
+
+        def distance(a, b):
+            ax, ay = divmod(a, stride)
+            bx, by = divmod(b, stride)
+            return octile((ax, ay), (bx, by))
+
+        parents = {start: None}
+        costs = {start: 0}
+        heap = [(distance(start, goal), 0, start)]
+        while heap:
+            _, cost, node = heappop(heap)
+            if node == goal:
+                return self.expand(parents, goal)
+            if cost > costs[node]:
+                continue
+            for dx, dy in self.get_neighbors(node, parents[node]):
+                point = self.jump(node + dx * stride + dy, dx, dy, goal)
+                if point is None:
+                    continue
+                new_cost = cost + distance(node, point)
+                if new_cost < costs.get(point, float('inf')):
+                    costs[point] = new_cost
+                    parents[point] = node
+                    heappush(heap, (new_cost + distance(point, goal),
+                                    new_cost, point))
+        return None
+
+    def get_neighbors(self, node, parent):
+        grid = self.grid
+        stride = self.stride
+        if parent is None:
+            for dx, dy in DIRECTIONS:
+                if not grid[node + dx * stride + dy]:
+                    continue
+                if dx and dy and not (grid[node + dx * stride]
+                                      and grid[node + dy]):
+                    continue
+                yield dx, dy
+            return
+
+        x, y = divmod(node, stride)
+        parent_x, parent_y = divmod(parent, stride)
+        dx = _sign(x - parent_x)
+        dy = _sign(y - parent_y)
+        if dx and dy:
+            if grid[node + dy]:
+                yield 0, dy
+            if grid[node + dx * stride]:
+                yield dx, 0
+            if grid[node + dy] and grid[node + dx * stride]:
+                yield dx, dy
+        elif dx:
+            ahead = grid[node + dx * stride]
+            for side in (1, -1):
+                if grid[node + side]:
+                    if ahead:
+                        yield dx, side
+                    yield 0, side
+            if ahead:
+                yield dx, 0
+        else:
+            ahead = grid[node + dy]
+            for side in (1, -1):
+                if grid[node + side * stride]:
+                    if ahead:
+                        yield side, dy
+                    yield side, 0
+            if ahead:
+                yield 0, dy
+
+    def jump(self, node, dx, dy, goal):
+        grid = self.grid
+        stride = self.stride
+        step_x = dx * stride
+        step = step_x + dy
+        while True:
+            if not grid[node]:
+                return None
+            if node == goal:
+                return node
+            if dx and dy:
+                if (self.jump(node + step_x, dx, 0, goal) is not None
+                        or self.jump(node + dy, 0, dy, goal) is not None):
+                    return node
+            elif dx:
+                if ((grid[node - 1] and not grid[node - step_x - 1])
+                        or (grid[node + 1] and not grid[node - step_x + 1])):
+                    return node
+            else:
+                if ((grid[node - stride] and not grid[node - stride - dy])
+                        or (grid[node + stride]
+                            and not grid[node + stride - dy])):
+                    return node
+            if not (grid[node + step_x] and grid[node + dy]):
+                return None
+            node += step
+
+    def expand(self, parents, goal):
+        # fill in the tiles between consecutive jump points
+        points = []
+        node = goal
+        while node is not None:
+            x, y = divmod(node, self.stride)
+            points.append((x - 1, y - 1))
+            node = parents[node]
+        points.reverse()
+        path = [points[0]]
+        for point in points[1:]:
+            x, y = path[-1]
+            dx = _sign(point[0] - x)
+            dy = _sign(point[1] - y)
+            while (x, y) != point:
+                x += dx
+                y += dy
+                path.append((x, y))
+        return path
@@ -0,0 +1,74 @@
+from math import ceil, floor
+
+from .constant import DEFAULT_ACCELERATION, DEFAULT_VELOCITY
+from .util import frange, pf_ceil, pf_floor
+
+__all__ = ['accelerate', 'move']
+
+
+def accelerate(velocity, direction, dt, max_velocity=DEFAULT_VELOCITY,
+               acceleration=DEFAULT_ACCELERATION):
+    result = []
+    for v, d in zip(velocity, direction):
+        if d == 0:
+            if abs(v) < acceleration * dt:
+                v = 0
+            elif v > 0:
+                v -= acceleration * dt
+            else:
+                v += acceleration * dt
+        else:
+            v += d * acceleration * dt
+            v = min(max_velocity, max(-max_velocity, v))
+        result.append(v)
+    return result
+
+
+def move(tilemap, position, velocity, dt):
+    # the new position of a 1x1 hitbox centred on position, stopped on
+    # the first tile border where it would collide
+    x_velocity, y_velocity = velocity
+    original_x, original_y = position
+    expected_x = original_x + x_velocity * dt
+    expected_y = original_y + y_velocity * dt
+    x_lower, x_upper = ((original_x, expected_x) if x_velocity > 0
+                        else (expected_x, original_x))
+    y_lower, y_upper = ((original_y, expected_y) if y_velocity > 0
+                        else (expected_y, original_y))
+    x_checkpoints = {*()}
+    y_checkpoints = {*()}
+    if x_velocity != 0:
+        for x in frange(pf_ceil(x_lower), pf_floor(x_upper) + 1):
+            x_checkpoints.add((x - original_x) / x_velocity)
+    if y_velocity != 0:
+        for y in frange(pf_ceil(y_lower), pf_floor(y_upper) + 1):
+            y_checkpoints.add((y - original_y) / y_velocity)
+
+    vx_pos = x_velocity > 0
+    vy_pos = y_velocity > 0
+    checkpoints = sorted({*x_checkpoints, *y_checkpoints})
+    for elapsed in checkpoints:
+        current_x = original_x + x_velocity * elapsed
+        current_y = original_y + y_velocity * elapsed
+
+        if x_velocity != 0 and elapsed in x_checkpoints:
+            block_y = current_y - 0.5
+            int_x = floor(current_x) + (1 if vx_pos else -1)
+            for y in range(floor(block_y), ceil(block_y) + 1):
+                if tilemap.collides(int_x, y):
+                    x_velocity = 0
+                    break
+        if y_velocity != 0 and elapsed in y_checkpoints:
+            block_x = current_x - 0.5
+            int_y = floor(current_y) + (1 if vy_pos else -1)
+            for x in range(floor(block_x), ceil(block_x) + 1):
+                if tilemap.collides(x, int_y):
+                    y_velocity = 0
+                    break
+        if x_velocity == 0 and y_velocity == 0:
+            break
+    else:
+        elapsed = dt
+
+    return [original_x + x_velocity * elapsed,
+            original_y + y_velocity * elapsed]
@@ -1,6 +1,7 @@
 from numbers import Number
 from pathlib import Path
 
+from .inventory import Inventory
 from .smartdata import SmartData
 
 __all__ = ['Profile']
@@ -11,7 +12,9 @@ class Profile(SmartData):
 
     achievements: dict[str, bool] = {}
     skills: dict[str, Number] = {}
-    items: list = []
+    items: Inventory = Inventory()
+    # partial achievement progress, keyed by achievement/condition index
+    progress: dict[str, int] = {}
 
     last_update: int = 0
 
@@ -1,10 +1,159 @@
+from math import ceil, inf
+
 from .smartdata import SmartData
 
-__all__ = ['Recipe']
+__all__ = ['Recipe', 'RecipeBook']
 
 
 class Recipe(SmartData):
-    def __init__(self, name, ingredients, result):
-        self.name = name
-        self.ingredients = ingredients
-        self.result = result
+    name: str
+    ingredients: dict[str, int]
+    result: str
+    count: int = 1
+
+
+class RecipeBook:
+    recipes: dict[str, Recipe]
+    by_ingredient: dict[str, list[Recipe]]
+    by_result: dict[str, list[Recipe]]
+    counts: dict[str, int]
+    missing: dict[str, int]
+    craftable: set[str]
+
+    def __init__(self, recipes=(), counts=None):
+        self.recipes = {}
+        self.by_ingredient = {}
+        self.by_result = {}
+        self.counts = {}
+        self.missing = {}
+        self.craftable = {*()}
+        self.costs = {}
+        for recipe in recipes:
+            self.add(recipe)
+        if counts is not None:
+            self.set_counts(counts)
+
+    def add(self, recipe):
+        if recipe.name in self.recipes:
+            raise ValueError(f'duplicate recipe {recipe.name}')
+        self.recipes[recipe.name] = recipe
+        for item in recipe.ingredients:
+            self.by_ingredient.setdefault(item, []).append(recipe)
+        self.by_result.setdefault(recipe.result, []).append(recipe)
+        self.missing[recipe.name] = sum(
+            self.counts.get(item, 0) < amount
+            for item, amount in recipe.ingredients.items())
+        if self.missing[recipe.name] == 0:
+            self.craftable.add(recipe.name)
+        self.costs.clear()
+
+    def set_counts(self, counts):
+        for item in [*self.counts]:
+            if item not in counts:
+                self.update(item, 0)
+        for item, count in counts.items():
+            self.update(item, count)
+
+    def update(self, item, count):
+        # only recipes that use the item are looked at
+        old = self.counts.get(item, 0)
+        if count:
+            self.counts[item] = count
+        else:
+            self.counts.pop(item, None)
+        for recipe in self.by_ingredient.get(item, ()):
+            amount = recipe.ingredients[item]
+            change = (old < amount) - (count < amount)
+            if change == 0:
+                continue
+            self.missing[recipe.name] -= change
+            if self.missing[recipe.name] == 0:
+                self.craftable.add(recipe.name)
+            else:
+                self.craftable.discard(recipe.name)
+
+    def get_craftable(self):
+        return [self.recipes[name] for name in sorted(self.craftable)]
+
+    def get_cost(self, item):
+        # base items needed per unit through the cheapest recipes, memoized
+        # until a recipe is added; items only made in a cycle cost inf
+        if item not in self.costs:
+            self.find_cost(item, {*()})
+        return self.costs[item]
+
+    def find_cost(self, item, visiting):
+        if item in self.costs:
+            return self.costs[item], False
+        recipes = self.by_result.get(item)
+        if not recipes:
+            self.costs[item] = 1
+            return 1, False
+        if item in visiting:
+            return inf, True
+        visiting.add(item)
+        best = inf
+        cyclic = False
+        for recipe in recipes:
+            total = 0
+            for ingredient, amount in recipe.ingredients.items():
+                cost, ingredient_cyclic = self.find_cost(ingredient, visiting)
+                cyclic |= ingredient_cyclic
+                total += amount * cost
+            best = min(best, total / recipe.count)
+        visiting.discard(item)
+        # a cost cut short by a cycle through an outer item is only valid
+        # while that item is being costed
+        if not cyclic or not visiting:
+            self.costs[item] = best
+        return best, cyclic and bool(visiting)
+
+    def resolve(self, item, count=1):
+        # returns [(recipe, times), ...] in crafting order, or None
+        self.journal = []
+        self.stock = {}
+        steps = []
+        found = self.take(item, count, steps, {*()})
+        del self.journal, self.stock
+        return steps if found else None
+
+    def get_stock(self, item):
+        return self.counts.get(item, 0) + self.stock.get(item, 0)
+
+    def change_stock(self, item, amount):
+        self.journal.append((item, self.stock.get(item, 0)))
+        self.stock[item] = self.stock.get(item, 0) + amount
+
+    def rollback(self, mark):
+        while len(self.journal) > mark:
+            item, amount = self.journal.pop()
+            self.stock[item] = amount
+
+    def take(self, item, count, steps, path):
+        used = min(self.get_stock(item), count)
+        if used:
+            self.change_stock(item, -used)
+        count -= used
+        if count == 0:
+            return True
+        if item in path or self.get_cost(item) == inf:
+            return False
+        path.add(item)
+        recipes = sorted(self.by_result.get(item, ()), key=lambda recipe: sum(
+            amount * self.get_cost(ingredient)
+            for ingredient, amount in recipe.ingredients.items()
+        ) / recipe.count)
+        for recipe in recipes:
+            times = ceil(count / recipe.count)
+            mark = len(self.journal)
+            step_mark = len(steps)
+            if all(self.take(ingredient, amount * times, steps, path)
+                   for ingredient, amount in recipe.ingredients.items()):
+                steps.append((recipe, times))
+                self.change_stock(item, times * recipe.count - count)
+                path.discard(item)
+                return True
+            self.rollback(mark)
+            del steps[step_mark:]
+        path.discard(item)
+        return False
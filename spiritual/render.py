@@ -0,0 +1,45 @@
+from pygame.surface import Surface
+
+__all__ = ['RenderQueue']
+
+# pygame-ce has fblits, which skips building the sequence of dirty rects
+FAST_BLITS = hasattr(Surface, 'fblits')
+
+
+class RenderQueue:
+    # elements blit into the queue while drawing, present() then hands
+    # every priority layer to the screen in a single call
+    layers: dict[int, list]
+    size: tuple[int, int]
+
+    def __init__(self, size=(0, 0)):
+        self.layers = {}
+        self.size = size
+        self.set_priority(0)
+
+    def get_size(self):
+        return self.size
+
+    def set_priority(self, priority):
+        layer = self.layers.get(priority)
+        if layer is None:
+            layer = self.layers[priority] = []
+        self.layer = layer
+
+    def blit(self, surface, position):
+        self.layer.append((surface, position))
+
+    def __len__(self):
+        return sum(len(layer) for layer in self.layers.values())
+
+    def present(self, screen):
+        for priority in sorted(self.layers):
+            layer = self.layers[priority]
+            if not layer:
+                continue
+            if FAST_BLITS:
+                screen.fblits(layer)
+            else:
+                screen.blits(layer, doreturn=False)
+            # the lists are reused by the next frame
+            layer.clear()
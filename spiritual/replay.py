@@ -0,0 +1,148 @@
+from pygame.event import Event
+from pygame.key import get_pressed
+from pygame.version import ver as pygame_version
+
+from gzip import open as gzip_open
+from json import dumps as json_dumps, loads as json_loads
+from time import perf_counter
+
+__all__ = ['KeyRecorder', 'KeyReplay', 'Recorder', 'ReplayResult', 'replay']
+
+# every line of a log is compact JSON: a header object, one
+# [dt, events, pressed keys] list per frame, and a footer object
+RECORD_VERSION = 1
+
+
+def _dump_attrs(attrs):
+    result = {}
+    for key, value in attrs.items():
+        if isinstance(value, tuple):
+            value = [*value]
+        if isinstance(value, list):
+            if all(isinstance(item, (bool, float, int, str))
+                   for item in value):
+                result[key] = value
+        elif value is None or isinstance(value, (bool, float, int, str)):
+            result[key] = value
+    return result
+
+
+def _load_attrs(attrs):
+    return {key: tuple(value) if isinstance(value, list) else value
+            for key, value in attrs.items()}
+
+
+def _get_position(window):
+    position = getattr(window.state, 'position', None)
+    return None if position is None else [*position]
+
+
+class KeyRecorder:
+    def __init__(self, pressed):
+        self.state = pressed
+        self.pressed = {*()}
+
+    def __getitem__(self, key):
+        # only the keys the game asks about end up in the log
+        value = self.state[key]
+        if value:
+            self.pressed.add(key)
+        return value
+
+
+class KeyReplay:
+    def __init__(self, pressed):
+        self.pressed = {*pressed}
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class Recorder:
+    def __init__(self, path, window_size):
+        self.file = gzip_open(path, 'wt')
+        self.frame = None
+        self.keys = None
+        self.write({
+            'version': RECORD_VERSION,
+            'pygame': pygame_version,
+            'size': [*window_size],
+        })
+
+    def write(self, obj):
+        self.file.write(json_dumps(obj, separators=(',', ':')) + '\n')
+
+    def flush_frame(self):
+        if self.frame is None:
+            return
+        dt, events = self.frame
+        pressed = sorted(self.keys.pressed)
+        if pressed:
+            self.write([dt, events, pressed])
+        elif events:
+            self.write([dt, events])
+        else:
+            self.write([dt])
+        self.frame = None
+
+    def record_frame(self, events, dt):
+        self.flush_frame()
+        self.frame = (dt, [[event.type, _dump_attrs(event.dict)]
+                           for event in events])
+        self.keys = KeyRecorder(get_pressed())
+        return self.keys
+
+    def close(self, window):
+        self.flush_frame()
+        self.write({'position': _get_position(window)})
+        self.file.close()
+
+
+class ReplayResult:
+    path: str
+    frames: int
+    elapsed: float
+    position: list[float] | None
+    expected: list[float] | None
+
+    def __init__(self, path, frames, elapsed, position, expected):
+        self.path = path
+        self.frames = frames
+        self.elapsed = elapsed
+        self.position = position
+        self.expected = expected
+
+    @property
+    def ok(self):
+        return self.position == self.expected
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed else float('inf')
+
+
+def replay(path, window_type):
+    with gzip_open(path, 'rt') as file:
+        header = json_loads(file.readline())
+        if header.get('version') != RECORD_VERSION:
+            raise ValueError(f'unsupported record version in {path}')
+        window = window_type(tuple(header['size']))
+        expected = None
+        frames = 0
+        start = perf_counter()
+        for line in file:
+            frame = json_loads(line)
+            if isinstance(frame, dict):
+                expected = frame['position']
+                break
+            dt, events, pressed = (frame + [[], []])[:3]
+            for event_type, attrs in events:
+                window.on_event(Event(event_type, _load_attrs(attrs)))
+            window.apply_resize()
+            window.keys = KeyReplay(pressed)
+            window.update(dt)
+            frames += 1
+        elapsed = perf_counter() - start
+    position = _get_position(window)
+    window.close()
+    return ReplayResult(path, frames, elapsed, position, expected)
@@ -0,0 +1,278 @@
+from asyncio import (
+    gather, get_running_loop, open_connection, sleep, start_server,
+    to_thread,
+)
+from collections import deque
+from json import (
+    JSONDecodeError, dumps as json_dumps, load as json_load,
+    loads as json_loads,
+)
+from math import floor, isfinite
+from pathlib import Path
+from random import Random
+
+from .physics import accelerate, move
+from .profile import Profile
+from .tilemap import TILEMAPS
+
+__all__ = ['Session', 'Server', 'Client', 'run_load']
+
+# one JSON object per line each way, every request gets one response:
+#   {"op": "join", "profile": name, "location": "spawn"} -> {"session": id}
+#   {"op": "input", "session": id, "direction": [dx, dy]} -> {"ok": true}
+#   {"op": "state", "session": id} -> {"position": ..., "velocity": ...}
+#   {"op": "leave", "session": id} -> {"ok": true}
+#   {"op": "stats"} -> Server.get_stats()
+# a failed request gets {"error": message}
+
+
+def load_profile(name):
+    # names come from clients, they must not leave the profiles directory
+    directory = Path.home().joinpath('spiritual', 'profiles')
+    if not isinstance(name, str) or not name or '/' in name or '\\' in name:
+        raise ValueError(f'invalid profile name {name!r}')
+    path = directory.joinpath(f'{name}.json')
+    if path.resolve().parent != directory.resolve():
+        raise ValueError(f'invalid profile name {name!r}')
+    try:
+        with open(path) as file:
+            data = json_load(file)
+    except (OSError, JSONDecodeError):
+        return Profile.new(name)
+    if not isinstance(data, dict) or not Profile.is_valid(data):
+        raise ValueError(f'invalid profile {name}')
+    return Profile.loads(data)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class Session:
+    id: int
+    profile: Profile
+    location: str
+
+    def __init__(self, id, profile, location, position=(4, 3),
+                 tilemaps=TILEMAPS):
+        if location not in tilemaps:
+            raise ValueError(f'invalid location {location}')
+        self.id = id
+        self.profile = profile
+        self.location = location
+        self.tilemap = tilemaps[location]
+        self.position = [*position]
+        self.velocity = [0, 0]
+        self.direction = (0, 0)
+
+    def tick(self, dt):
+        # the same update GameState runs for the player
+        self.velocity = accelerate(self.velocity, self.direction, dt)
+        if self.velocity[0] != 0 or self.velocity[1] != 0:
+            self.position = move(self.tilemap, self.position, self.velocity,
+                                 dt)
+
+    def get_state(self):
+        return {'position': self.position, 'velocity': self.velocity,
+                'location': self.location}
+
+
+class Server:
+    sessions: dict[int, Session]
+
+    def __init__(self, tick_rate=60, history=1000, tilemaps=TILEMAPS):
+        # SHARED_TILEMAPS lets server processes share one copy of each map
+        self.tick_rate = tick_rate
+        self.tilemaps = tilemaps
+        self.sessions = {}
+        self.next_id = 0
+        # seconds from the scheduled start of a tick to its end
+        self.latencies = deque(maxlen=history)
+        self.busy = 0.0
+        self.ticks = 0
+        self.skipped = 0
+        self.server = None
+        self.ticker = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.server = await start_server(self.on_client, host, port)
+        self.ticker = get_running_loop().create_task(self.run_ticks())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.ticker.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def run_ticks(self):
+        # every session advances by the same fixed step on one schedule
+        loop = get_running_loop()
+        dt = 1 / self.tick_rate
+        next_time = loop.time()
+        while True:
+            next_time += dt
+            await sleep(max(next_time - loop.time(), 0))
+            start = loop.time()
+            for session in self.sessions.values():
+                session.tick(dt)
+            end = loop.time()
+            self.latencies.append(end - next_time)
+            self.busy += end - start
+            self.ticks += 1
+            if end - next_time > dt:
+                # too far behind to catch up, drop the missed ticks
+                self.skipped += int((end - next_time) / dt)
+                next_time = end
+
+    async def on_client(self, reader, writer):
+        owned = {*()}
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle(json_loads(line), owned)
+                except (ValueError, KeyError, TypeError) as error:
+                    response = {'error': str(error)}
+                writer.write(json_dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # sessions end with the connection that opened them
+            for session_id in owned:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+    async def handle(self, request, owned):
+        op = request['op']
+        if op == 'join':
+            location = request.get('location', 'spawn')
+            if not isinstance(location, str) or location not in self.tilemaps:
+                raise ValueError(f'invalid location {location!r}')
+            profile = await to_thread(load_profile, request['profile'])
+            session = Session(self.next_id, profile, location,
+                              tilemaps=self.tilemaps)
+            self.next_id += 1
+            self.sessions[session.id] = session
+            owned.add(session.id)
+            return {'session': session.id}
+        elif op == 'stats':
+            return self.get_stats()
+        session_id = request['session']
+        if session_id not in owned:
+            raise ValueError(f'unknown session {session_id}')
+        if op == 'input':
+            direction = request['direction']
+            if not (isinstance(direction, list) and len(direction) == 2
+                    and all(isinstance(d, int | float) and isfinite(d)
+                            for d in direction)):
+                raise ValueError(f'invalid direction {direction!r}')
+            dx, dy = (max(-1, min(1, int(d))) for d in direction)
+            self.sessions[session_id].direction = (dx, dy)
+            return {'ok': True}
+        elif op == 'state':
+            return self.sessions[session_id].get_state()
+        elif op == 'leave':
+            owned.discard(session_id)
+            del self.sessions[session_id]
+            return {'ok': True}
+        raise ValueError(f'unknown op {op}')
+
+    def get_stats(self):
+        latencies = [*self.latencies]
+        elapsed = self.ticks / self.tick_rate
+        load = self.busy / elapsed if elapsed else 0.0
+        return {
+            'sessions': len(self.sessions),
+            'ticks': self.ticks,
+            'skipped': self.skipped,
+            'load': load,
+            # sessions one core could keep up with at this tick rate
+            'sessions_per_core': len(self.sessions) / load if load else None,
+            'latency_ms': {
+                name: percentile(latencies, fraction) * 1000
+                for name, fraction in (('p50', 0.5), ('p90', 0.9),
+                                       ('p99', 0.99), ('max', 1.0))},
+        }
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=0):
+        return cls(*await open_connection(host, port))
+
+    async def request(self, **request):
+        self.writer.write(json_dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        response = json_loads(await self.reader.readline())
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    async def join(self, profile, location='spawn'):
+        return (await self.request(op='join', profile=profile,
+                                   location=location))['session']
+
+    async def send_input(self, session, direction):
+        await self.request(op='input', session=session,
+                           direction=[*direction])
+
+    async def get_state(self, session):
+        return await self.request(op='state', session=session)
+
+    async def get_stats(self):
+        return await self.request(op='stats')
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_load(sessions=100, clients=10, seconds=5.0, tick_rate=60,
+                   input_rate=4, seed=0, tilemaps=TILEMAPS):
+    # a local stand-in for real clients: every session changes direction
+    # input_rate times a second, the result is the server stats plus the
+    # number of sessions that ended in an impossible state
+    server = Server(tick_rate, tilemaps=tilemaps)
+    port = await server.start()
+    connections = [await Client.connect(port=port) for _ in range(clients)]
+    joined = []
+    for i in range(sessions):
+        client = connections[i % clients]
+        joined.append((client, await client.join(f'load{i}')))
+    server.latencies.clear()
+    server.busy = 0.0
+    server.ticks = 0
+
+    async def drive(client, ids, rng):
+        loop = get_running_loop()
+        end = loop.time() + seconds
+        while loop.time() < end:
+            for id in ids:
+                await client.send_input(
+                    id, (rng.randint(-1, 1), rng.randint(-1, 1)))
+            await sleep(1 / input_rate)
+
+    await gather(*(
+        drive(client, [id for owner, id in joined if owner is client],
+              Random(seed + i))
+        for i, client in enumerate(connections)))
+    stats = await connections[0].get_stats()
+    invalid = 0
+    for client, id in joined:
+        x, y = (await client.get_state(id))['position']
+        tilemap = server.sessions[id].tilemap
+        if not (isfinite(x) and isfinite(y)) or tilemap.collides(
+                floor(x), floor(y)):
+            invalid += 1
+    stats['invalid'] = invalid
+    for client in connections:
+        await client.close()
+    await server.stop()
+    return stats
@@ -0,0 +1,148 @@
+from json import dumps as json_dumps, loads as json_loads
+from mmap import ACCESS_READ, mmap
+from os import getpid, replace
+from os.path import getmtime
+from pathlib import Path
+from struct import Struct
+
+import numpy as np
+
+from .tilemap import COLLISSION_TILES, TILEMAPS
+
+__all__ = ['MAGIC', 'write_shared', 'SharedTilemap', 'SharedTilemaps',
+           'SHARED_TILEMAPS']
+
+# layout: MAGIC, header length, JSON header, then the palette index of
+# every tile and the collision mask, one byte per tile, columns first;
+# both arrays start on an ALIGNMENT boundary so they can be viewed in place
+MAGIC = b'SPSHM\x01'
+HEADER_LENGTH = Struct('<I')
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_shared(path, tilemap):
+    width, height = tilemap.get_size()
+    palette = sorted({tile for column in tilemap.tilemap for tile in column})
+    if len(palette) > 0xff:
+        raise ValueError('too many tile types')
+    palette_index = {tile: index for index, tile in enumerate(palette)}
+    tiles = bytes(palette_index[tile]
+                  for column in tilemap.tilemap for tile in column)
+    mask = b''.join(tilemap.collisions)
+
+    # the header is padded so its own length does not move the arrays
+    header = {'size': [width, height], 'palette': palette,
+              'sources': tilemap.sources, 'tiles': 0, 'mask': 0}
+    start = _align(len(MAGIC) + HEADER_LENGTH.size
+                   + len(json_dumps(header)) + 32)
+    header['tiles'] = start
+    header['mask'] = _align(start + len(tiles))
+    encoded = json_dumps(header).encode()
+    prefix = MAGIC + HEADER_LENGTH.pack(len(encoded)) + encoded
+
+    # workers may attach while another process rebuilds the file
+    temp_path = f'{path}.{getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(prefix.ljust(start, b'\0'))
+        file.write(tiles.ljust(header['mask'] - start, b'\0'))
+        file.write(mask)
+    replace(temp_path, path)
+
+
+class SharedTilemap:
+    # read-only Tilemap backed by a memory map, the pages are shared by
+    # every process that attaches the same file
+    palette: list[str]
+    sources: dict[str, str]
+    version: int = 0
+    modified: bool = False
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.buffer = mmap(file.fileno(), 0, access=ACCESS_READ)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a shared tilemap file')
+        (header_length,) = HEADER_LENGTH.unpack_from(self.buffer, len(MAGIC))
+        start = len(MAGIC) + HEADER_LENGTH.size
+        header = json_loads(self.buffer[start:start + header_length])
+        self.width, self.height = header['size']
+        self.palette = header['palette']
+        self.sources = header['sources']
+        count = self.width * self.height
+        view = memoryview(self.buffer)
+        self.tiles = view[header['tiles']:header['tiles'] + count]
+        self.collisions = view[header['mask']:header['mask'] + count]
+        self.mask = np.frombuffer(self.buffer, bool, count,
+                                  header['mask']).reshape(
+            self.width, self.height)
+        self.dirty = {*()}
+
+    def get_size(self):
+        return (self.width, self.height)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def collides(self, x, y):
+        if not self.in_bounds(x, y):
+            return 'empty' in COLLISSION_TILES
+        return self.collisions[x * self.height + y]
+
+    def get_mask(self):
+        return self.mask
+
+    def get_tiles(self):
+        return np.frombuffer(self.tiles, np.uint8).reshape(
+            self.width, self.height)
+
+    def set_tile(self, x, y, tile):
+        raise ValueError('shared tilemaps are read-only')
+
+    def pop_dirty(self):
+        return {*()}
+
+    def get_nbytes(self):
+        # the mapped pages belong to the page cache, not the process
+        return 0
+
+    def __getitem__(self, key):
+        x, y = key
+        if not self.in_bounds(x, y):
+            return 'empty'
+        return self.palette[self.tiles[x * self.height + y]]
+
+
+class SharedTilemaps:
+    def __init__(self, directory, registry=TILEMAPS):
+        self.directory = Path(directory)
+        self.registry = registry
+        self.attached = {}
+
+    def __contains__(self, location):
+        return location in self.registry
+
+    def __getitem__(self, location):
+        if location not in self.attached:
+            if location not in self.registry:
+                raise KeyError(location)
+            path = self.get_path(location)
+            if self.is_stale(location, path):
+                self.directory.mkdir(parents=True, exist_ok=True)
+                write_shared(path, self.registry.load(location))
+            self.attached[location] = SharedTilemap(path)
+        return self.attached[location]
+
+    def get_path(self, location):
+        return self.directory.joinpath(f'{location}.shm')
+
+    def is_stale(self, location, path):
+        # rebuilt when the map asset is newer
+        return (not path.exists()
+                or getmtime(path) < getmtime(f'assets/{location}.map'))
+
+
+SHARED_TILEMAPS = SharedTilemaps(Path.home().joinpath('spiritual', 'cache'))
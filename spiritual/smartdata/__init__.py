@@ -1,4 +1,6 @@
 from .smartdata import *
 from .smartdata import __all__ as __smartdata_all__
+from .tracking import *
+from .tracking import __all__ as __tracking_all__
 
-__all__ = __smartdata_all__ + []
+__all__ = __smartdata_all__ + __tracking_all__
@@ -1,14 +1,19 @@
+from copy import deepcopy
 from json import load as json_load
 from types import GenericAlias, UnionType
 
-from ..myjson import dump as json_dump
+from ..myjson import build_value, dump as json_dump, parse, skip_value
+from .tracking import TrackedDict, TrackedList
 
-__all__ = ['SmartData', 'is_type', 'load_value', 'dump_value']
+__all__ = [
+    'SmartData', 'is_type', 'find_invalid', 'check_events', 'load_value',
+    'dump_value',
+]
 
 
 def is_type(obj, type_):
-    if issubclass(type_, SmartData):
-        return type_.is_valid(obj)
+    if isinstance(type_, type) and issubclass(type_, SmartData):
+        return isinstance(obj, type_) or type_.is_valid(obj)
     elif isinstance(type_, type):
         return isinstance(obj, type_)
     elif isinstance(type_, UnionType):
@@ -55,11 +60,89 @@ def is_type(obj, type_):
         raise NotImplementedError(f'Unknown type: {type_}')
 
 
+def find_invalid(obj, type_, path=()):
+    # paths of the innermost values that fail is_type
+    if is_type(obj, type_):
+        return []
+    result = []
+    if (isinstance(type_, type) and issubclass(type_, SmartData)
+            and isinstance(obj, dict)):
+        for key, field_type in type_.__annotations__.items():
+            if key in obj:
+                result += find_invalid(obj[key], field_type, (*path, key))
+            elif not hasattr(type_, key):
+                result.append((*path, key))
+    elif isinstance(type_, GenericAlias) and isinstance(obj, list | dict):
+        origin = type_.__origin__
+        if origin is dict and isinstance(obj, dict):
+            key_type, value_type = type_.__args__
+            for key, value in obj.items():
+                if not is_type(key, key_type):
+                    result.append((*path, key))
+                else:
+                    result += find_invalid(value, value_type, (*path, key))
+        elif origin in (list, set) and isinstance(obj, list):
+            for i, item in enumerate(obj):
+                result += find_invalid(item, type_.__args__[0], (*path, i))
+    return result or [path]
+
+
+def _check_items(events, end, check):
+    for i, (event, value) in enumerate(events):
+        if event == end:
+            return True
+        if not check(i, event, value):
+            return False
+    return False
+
+
+def check_events(events, event, value, type_):
+    # is_type for a value still in the parse events; lists, dicts and
+    # SmartData are checked as they stream past, so memory stays bounded
+    # by nesting depth. Returns as soon as a value fails
+    if isinstance(type_, type) and issubclass(type_, SmartData):
+        return type_.check_stream(events, event, value)
+    elif isinstance(type_, GenericAlias) and type_.__origin__ is dict:
+        if event != 'start_map':
+            return False
+        key_type, value_type = type_.__args__
+        for event, key in events:
+            if event == 'end_map':
+                return True
+            if not is_type(key, key_type):
+                return False
+            if not check_events(events, *next(events), value_type):
+                return False
+        return False
+    elif isinstance(type_, GenericAlias) and type_.__origin__ in (list, set):
+        if event != 'start_array':
+            return False
+        arg = type_.__args__[0]
+        return _check_items(events, 'end_array', lambda i, event, value:
+                            check_events(events, event, value, arg))
+    elif isinstance(type_, GenericAlias) and type_.__origin__ is tuple:
+        if event != 'start_array':
+            return False
+        args = type_.__args__
+        count = [0]
+
+        def check(i, event, value):
+            count[0] = i + 1
+            return i < len(args) and check_events(events, event, value,
+                                                   args[i])
+
+        return (_check_items(events, 'end_array', check)
+                and count[0] == len(args))
+    # unions need the whole value
+    return is_type(build_value(events, event, value), type_)
+
+
 def load_value(obj, type_):
-    if issubclass(type_, SmartData):
+    if isinstance(type_, type) and issubclass(type_, SmartData):
         return type_.loads(obj)
     elif isinstance(type_, type):
-        return type_(obj)
+        # abstract types such as Number cannot be called
+        return obj if isinstance(obj, type_) else type_(obj)
     elif isinstance(type_, UnionType):
         for arg in type_.__args__:
             if is_type(obj, arg):
@@ -131,15 +214,131 @@ class SmartData:
         for key, type_, default in fields[len(args):]:
             if key in used_kwargs:
                 continue
-            if default is None:
+            if not hasattr(type(self), key):
                 raise TypeError(f'Missing keyword argument {key}')
-            setattr(self, key, default)
+            # mutable defaults are not shared between instances
+            setattr(self, key, deepcopy(default))
+
+    def __setattr__(self, key, value):
+        root = self.__dict__.get('tracking_root')
+        if root is not None and key in self.__annotations__:
+            path = (*self.tracking_path, key)
+            value = root.wrap(value, path)
+            root.mark(path)
+        super().__setattr__(key, value)
+
+    def __getstate__(self):
+        # copies and pickles are not tracked
+        return {key: value for key, value in self.__dict__.items()
+                if key not in ('tracking_root', 'tracking_path', 'changes')}
+
+    def track(self, root=None, path=()):
+        # from now on field changes, including changes inside nested lists,
+        # dicts and SmartData, are recorded on the root as paths
+        if root is None:
+            root = self
+            self.__dict__['changes'] = {*()}
+        self.__dict__['tracking_root'] = root
+        self.__dict__['tracking_path'] = path
+        for key in self.__annotations__:
+            self.__dict__[key] = root.wrap(getattr(self, key), (*path, key))
+        return self
+
+    def wrap(self, value, path):
+        if isinstance(value, SmartData):
+            return value.track(self, path)
+        elif isinstance(value, dict):
+            return TrackedDict(value, self, path)
+        elif isinstance(value, list):
+            return TrackedList(value, self, path)
+        return value
+
+    def mark(self, path):
+        # a None key stands for a list item, which marks the whole list
+        if None in path:
+            path = path[:path.index(None)]
+        self.changes.add(path)
+
+    def get_path(self, path):
+        obj = self
+        for key in path:
+            if isinstance(obj, SmartData):
+                if key not in obj.__annotations__:
+                    return False, None
+                obj = getattr(obj, key)
+            elif isinstance(obj, dict) and key in obj:
+                obj = obj[key]
+            else:
+                return False, None
+        return True, obj
+
+    def diff(self):
+        # [path, value] sets a value and [path] deletes a key, paths
+        # covered by a changed parent are left out
+        changes = self.changes
+        patch = []
+        for path in sorted(changes, key=len):
+            if any(path[:i] in changes for i in range(1, len(path))):
+                continue
+            found, value = self.get_path(path)
+            if found:
+                patch.append([[*path], dump_value(value)])
+            else:
+                patch.append([[*path]])
+        return patch
+
+    def checkpoint(self):
+        patch = self.diff()
+        self.changes.clear()
+        return patch
+
+    def apply_patch(self, patch):
+        for change in patch:
+            *keys, key = change[0]
+            obj = self
+            type_ = type(self)
+            for parent_key in keys:
+                obj, type_ = self.get_child(obj, type_, parent_key)
+            if isinstance(obj, SmartData):
+                if key not in obj.__annotations__ or len(change) == 1:
+                    raise ValueError(f'Invalid patch path {change[0]}')
+                value_type = obj.__annotations__[key]
+            else:
+                if len(change) == 1:
+                    obj.pop(key, None)
+                    continue
+                value_type = (type_.__args__[1]
+                              if isinstance(type_, GenericAlias) else None)
+            value = change[1]
+            if value_type is not None:
+                if not is_type(value, value_type):
+                    raise ValueError(f'Invalid type for path {change[0]}')
+                value = load_value(value, value_type)
+            if isinstance(obj, SmartData):
+                setattr(obj, key, value)
+            else:
+                obj[key] = value
+
+    @staticmethod
+    def get_child(obj, type_, key):
+        if isinstance(obj, SmartData):
+            if key not in obj.__annotations__:
+                raise ValueError(f'Invalid patch key {key}')
+            return getattr(obj, key), obj.__annotations__[key]
+        elif isinstance(obj, dict) and key in obj:
+            return obj[key], (type_.__args__[1]
+                              if isinstance(type_, GenericAlias) else None)
+        raise ValueError(f'Invalid patch key {key}')
 
     @classmethod
     def is_valid(cls, obj):
+        if not isinstance(obj, dict):
+            return False
         for key, type_ in cls.__annotations__.items():
             if key not in obj:
-                return False
+                if not hasattr(cls, key):
+                    return False
+                continue
             if not is_type(obj[key], type_):
                 return False
         return True
@@ -148,12 +347,87 @@ class SmartData:
     def load(cls, file):
         return cls.loads(json_load(file))
 
+    @classmethod
+    def check_stream(cls, events, event, value):
+        # the streaming is_valid, to be overridden along with it
+        if cls.is_valid.__func__ is not SmartData.is_valid.__func__:
+            return cls.is_valid(build_value(events, event, value))
+        if event != 'start_map':
+            return False
+        annotations = cls.__annotations__
+        seen = {*()}
+        for event, key in events:
+            if event == 'end_map':
+                return all(key in seen or hasattr(cls, key)
+                           for key in annotations)
+            event, value = next(events)
+            if key in annotations:
+                if not check_events(events, event, value, annotations[key]):
+                    return False
+                seen.add(key)
+            else:
+                skip_value(events, event)
+        return False
+
+    @classmethod
+    def is_valid_stream(cls, file):
+        try:
+            events = parse(file)
+            if not check_events(events, *next(events), cls):
+                return False
+            for _ in events:
+                pass
+        except (ValueError, StopIteration):
+            return False
+        return True
+
+    @classmethod
+    def iterload(cls, file, fields=None):
+        # yields (key, value) for the fields of the top-level object as
+        # they are read, each one checked before the next is parsed; with
+        # fields given, the rest of the file is never read
+        events = parse(file)
+        if next(events, (None,))[0] != 'start_map':
+            raise ValueError('Expected an object')
+        wanted = None if fields is None else {*fields}
+        if wanted is not None and not wanted:
+            return
+        for event, key in events:
+            if event == 'end_map':
+                break
+            event, value = next(events)
+            if key not in cls.__annotations__ or (
+                    wanted is not None and key not in wanted):
+                skip_value(events, event)
+                continue
+            type_ = cls.__annotations__[key]
+            obj = build_value(events, event, value)
+            if not is_type(obj, type_):
+                raise ValueError(f'Invalid type for key {key}')
+            yield key, load_value(obj, type_)
+            if wanted is not None:
+                wanted.discard(key)
+                if not wanted:
+                    return
+        for _ in events:
+            pass
+
+    @classmethod
+    def load_stream(cls, file):
+        values = dict(cls.iterload(file))
+        for key in cls.__annotations__:
+            if key not in values and not hasattr(cls, key):
+                raise ValueError(f'Missing key {key}')
+        return cls(**values)
+
     @classmethod
     def loads(cls, obj):
         values = {}
         for key, type_ in cls.__annotations__.items():
-            if key not in obj and getattr(cls, key, None) is None:
-                raise ValueError(f'Missing key {key}')
+            if key not in obj:
+                if not hasattr(cls, key):
+                    raise ValueError(f'Missing key {key}')
+                continue
             if not is_type(obj[key], type_):
                 raise ValueError(f'Invalid type for key {key}')
             values[key] = load_value(obj[key], type_)
@@ -0,0 +1,121 @@
+__all__ = ['TrackedDict', 'TrackedList']
+
+
+class TrackedDict(dict):
+    # a change to a key marks path + (key,) on the root
+    def __init__(self, items, root, path):
+        super().__init__()
+        self.root = root
+        self.path = path
+        for key, value in items.items():
+            super().__setitem__(key, root.wrap(value, (*path, key)))
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self.root.wrap(value, (*self.path, key)))
+        self.root.mark((*self.path, key))
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.root.mark((*self.path, key))
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, key, *default):
+        if key in self:
+            self.root.mark((*self.path, key))
+        return super().pop(key, *default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.root.mark((*self.path, key))
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        super().clear()
+        self.root.mark(self.path)
+
+
+class TrackedList(list):
+    # any change marks the whole list, items are tracked with a None key
+    # so that changes inside them do too
+    def __init__(self, items, root, path):
+        self.root = root
+        self.path = path
+        super().__init__(root.wrap(item, (*path, None)) for item in items)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def wrap(self, item):
+        return self.root.wrap(item, (*self.path, None))
+
+    def changed(self):
+        self.root.mark(self.path)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [self.wrap(item) for item in value]
+        else:
+            value = self.wrap(value)
+        super().__setitem__(index, value)
+        self.changed()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.changed()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, count):
+        super().__imul__(count)
+        self.changed()
+        return self
+
+    def append(self, item):
+        super().append(self.wrap(item))
+        self.changed()
+
+    def extend(self, items):
+        super().extend(self.wrap(item) for item in items)
+        self.changed()
+
+    def insert(self, index, item):
+        super().insert(index, self.wrap(item))
+        self.changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self.changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self.changed()
+
+    def clear(self):
+        super().clear()
+        self.changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.changed()
+
+    def reverse(self):
+        super().reverse()
+        self.changed()
@@ -0,0 +1,35 @@
+from math import floor
+
+from pygame.rect import Rect
+
+__all__ = ['GridIndex']
+
+
+class GridIndex:
+    cell_size: int
+    cells: dict[tuple[int, int], list]
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def get_cells(self, rect: Rect):
+        size = self.cell_size
+        for x in range(floor(rect.left / size),
+                       floor((rect.right - 1) / size) + 1):
+            for y in range(floor(rect.top / size),
+                           floor((rect.bottom - 1) / size) + 1):
+                yield x, y
+
+    def insert(self, item, rect):
+        rect = Rect(rect)
+        for cell in self.get_cells(rect):
+            self.cells.setdefault(cell, []).append((item, rect))
+
+    def clear(self):
+        self.cells = {}
+
+    def query_point(self, pos):
+        cell = (floor(pos[0] / self.cell_size), floor(pos[1] / self.cell_size))
+        return [item for item, rect in self.cells.get(cell, ())
+                if rect.collidepoint(pos)]
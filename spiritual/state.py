@@ -1,20 +1,30 @@
 from pygame.constants import (
-    KEYDOWN, K_a, K_d, K_s, K_w,
-    SRCALPHA,
+    KEYDOWN, KEYUP, K_F3, K_F4, K_a, K_d, K_s, K_w,
+    MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL,
+    TEXTEDITING, TEXTINPUT,
 )
-from pygame.key import get_pressed
-from pygame.surface import Surface
 
-from json import JSONDecodeError, load as json_load
-from math import ceil, floor
+from math import ceil
+from os import scandir
 from pathlib import Path
 
+from .achievement import (
+    ACHIEVEMENTS, LOCATION_ENTERED, SKILL_RULES, AchievementEngine,
+)
+from .animation import AnimatedTiles, AnimationClock
 from .assets import PLAYER_DIRECTIONS
-from .constant import DEFAULT_VELOCITY, DEFAULT_ACCELERATION
-from .element import Button, Sprite, TextPrompt, Title
+from .baking import ChunkBaker
+from .camera import Camera
+from .debug import DebugOverlay
+from .element import Button, ScrollList, Sprite, TextPrompt, Title
+from .memory import MEMORY, deep_nbytes, surface_nbytes
+from .minimap import Minimap
+from .mobsystem import MobSystem
+from .pathfinding import Pathfinder
+from .physics import accelerate, move
 from .profile import Profile
-from .tilemap import TILEMAPS, TILES, COLLISSION_TILES
-from .util import frange, pf_ceil, pf_floor
+from .spatial import GridIndex
+from .tilemap import TILE_ANIMATIONS, TILEMAPS, TILES
 
 __all__ = [
     'State',
@@ -26,17 +36,73 @@ __all__ = [
 ]
 
 
+MOUSE_EVENTS = {MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL}
+KEY_EVENTS = {KEYDOWN, KEYUP, TEXTEDITING, TEXTINPUT}
+
+
 class State:
+    focused = None
+    pressed = ()
+    hit_index = None
+    mouse_pos = (0, 0)
+
     def __init__(self):
         self.elements = []
         self.priorities = []
 
+    @property
+    def elements(self):
+        return self._elements
+
+    @elements.setter
+    def elements(self, elements):
+        self._elements = elements
+        self.hit_index = None
+
+    def get_hit_index(self):
+        # rebuilt lazily, elements may still be appended after assignment
+        if self.hit_index is None:
+            self.hit_index = GridIndex()
+            for element in self.elements:
+                if element.interactive:
+                    self.hit_index.insert(element, element.rect)
+        return self.hit_index
+
+    def set_focus(self, element):
+        if self.focused is not None:
+            self.focused.focus = False
+        self.focused = element
+        if element is not None:
+            element.focus = True
+
     def on_resize(self, size: tuple[int, int], window):
         for element in self.elements:
             element.on_resize(size, window)
+        self.hit_index = None
 
     def on_event(self, event, window):
-        for element in self.elements:
+        if event.type in MOUSE_EVENTS:
+            if hasattr(event, 'pos'):
+                self.mouse_pos = event.pos
+            targets = self.get_hit_index().query_point(self.mouse_pos)
+            if event.type == MOUSEBUTTONDOWN:
+                focusable = [element for element in targets
+                             if element.focusable]
+                self.set_focus(focusable[-1] if focusable else None)
+                self.pressed = targets
+            elif event.type == MOUSEBUTTONUP:
+                # pressed elements also hear releases outside of them
+                targets += [element for element in self.pressed
+                            if element not in targets]
+                self.pressed = ()
+        elif event.type in KEY_EVENTS:
+            if self.focused is not None and self.focused.focus:
+                targets = [self.focused]
+            else:
+                targets = []
+        else:
+            targets = self.elements
+        for element in targets:
             element.on_event(event, window)
 
     def update(self, window, dt):
@@ -46,6 +112,9 @@ class State:
     def init(self, window):
         pass
 
+    def leave(self, window):
+        pass
+
 
 class MenuState(State):
     def __init__(self):
@@ -73,34 +142,11 @@ class MenuState(State):
 class ProfilesState(State):
     def __init__(self):
         self.profiles: list[Path] = []
-        for path in Path.home().joinpath('spiritual', 'profiles').iterdir():
-            if not path.is_file():
-                continue
-            try:
-                with open(path) as file:
-                    content = json_load(file)
-            except JSONDecodeError:
-                continue
-            if Profile.is_valid(content):
-                self.profiles.append(path)
-        self.page = 0
-        self.update_page()
-
-    def button_new(self, window):
-        window.set_state('new_profile')
-
-    def button_back(self, window):
-        window.set_state('menu')
-
-    def button_up(self, window):
-        if self.page > 0:
-            self.page -= 1
-
-    def button_down(self, window):
-        if self.page < len(self.profiles) // 4:
-            self.page += 1
-
-    def update_page(self):
+        self.entries = scandir(Path.home().joinpath('spiritual', 'profiles'))
+        self.profile_list = ScrollList(
+            200, 220, 400, 80, 100, 4, (192, 192, 192), self.get_profile,
+            None, 32, (0, 0, 0), self.button_profile,
+        )
         self.elements = [
             Title('Profiles', 200, 60, 400, 100, font_size=64),
             Button('New', 20, 220, 160, 60, (255, 255, 255),
@@ -111,38 +157,53 @@ class ProfilesState(State):
                    None, 32, (0, 0, 0), self.button_up),
             Button('Down', 620, 520, 160, 60, (255, 255, 255),
                    None, 32, (0, 0, 0), self.button_down),
+            self.profile_list,
         ]
-        for i in range(4):
-            if i + self.page * 4 >= len(self.profiles):
-                break
-            self.elements.append(
-                Button(
-                    self.profiles[i + self.page * 4].stem,
-                    200, 220 + 100 * i, 400, 80, (192, 192, 192),
-                    None, 32, (0, 0, 0), getattr(self, f'button_profile{i}')
-                )
-            )
         self.priorities = [0] * len(self.elements)
 
-    def button_profile0(self, window):
-        self.load_profile(self.profiles[self.page * 4], window)
+    def get_profile(self, index):
+        # the directory is only read as far as the list has scrolled
+        while index >= len(self.profiles) and self.entries is not None:
+            entry = next(self.entries, None)
+            if entry is None:
+                self.entries.close()
+                self.entries = None
+            elif entry.name.endswith('.json') and entry.is_file():
+                self.profiles.append(Path(entry.path))
+        if index < len(self.profiles):
+            return self.profiles[index].stem
+        return None
+
+    def leave(self, window):
+        # the list may be left before it was scrolled to the end
+        if self.entries is not None:
+            self.entries.close()
+            self.entries = None
 
-    def button_profile1(self, window):
-        self.load_profile(self.profiles[self.page * 4 + 1], window)
+    def button_new(self, window):
+        window.set_state('new_profile')
 
-    def button_profile2(self, window):
-        self.load_profile(self.profiles[self.page * 4 + 2], window)
+    def button_back(self, window):
+        window.set_state('menu')
 
-    def button_profile3(self, window):
-        self.load_profile(self.profiles[self.page * 4 + 3], window)
+    def button_up(self, window):
+        self.profile_list.scroll(-len(self.profile_list.rows))
+
+    def button_down(self, window):
+        self.profile_list.scroll(len(self.profile_list.rows))
+
+    def button_profile(self, index, window):
+        self.load_profile(self.profiles[index], window)
 
     def load_profile(self, path, window):
+        # fields are checked as they are read, a bad one stops the load
         with open(path) as file:
-            data = json_load(file)
-            if not Profile.is_valid(data):
+            try:
+                profile = Profile.load_stream(file)
+            except ValueError:
                 window.set_state('invalid_profile')
                 return
-            window.profile = Profile.loads(data)
+            window.profile = profile
             window.state.profile = window.profile
             window.set_state('game')
 
@@ -202,8 +263,10 @@ class GameState(State):
             Button('Back', 200, 510, 400, 80, (255, 255, 255),
                    None, 32, (0, 0, 0), self.button_back),
             Sprite(PLAYER_DIRECTIONS[0], 400, 300, 16, 16, 8, True),
+            DebugOverlay(),
+            Minimap(),
         ]
-        self.priorities = [0, 0, 0]
+        self.priorities = [0, 0, 0, 0, 0]
 
         self.paused = False
         # self.position = [0, 0]
@@ -211,19 +274,66 @@ class GameState(State):
         self.velocity = [0, 0]
         self.profile = None
         self.chunksprites = {}
+        self.visible_chunks = {}
+        self.camera = Camera()
+        self.visible_rect = None
+        self.animation = AnimationClock()
+        self.animated = AnimatedTiles(self.camera, self.animation)
+        self.baker = ChunkBaker()
+        # tile edits in chunks that are still baking
+        self.late_edits = {}
 
         self.direction = 0
 
     def init(self, window):
+        self.achievements = AchievementEngine(
+            self.profile, ACHIEVEMENTS, SKILL_RULES)
+        self.achievements.watch_inventory(self.profile.items)
+        MEMORY.register('chunks', 'game', self.get_chunk_nbytes)
+        MEMORY.register('scaled', 'game', self.get_scaled_nbytes,
+                        self.evict_scaled)
+        MEMORY.register('profile', 'game', lambda: deep_nbytes(self.profile))
         self.set_location('spawn')
         self.update(window, 0)
 
+    def leave(self, window):
+        # the profile outlives the state, and so do its listeners
+        self.achievements.unwatch_inventory(self.profile.items)
+        self.baker.close()
+        for category in ('chunks', 'scaled', 'profile'):
+            MEMORY.unregister(category, 'game')
+
+    def get_chunk_nbytes(self):
+        return sum(surface_nbytes(sprite.image)
+                   for sprite in self.chunksprites.values())
+
+    def get_scaled_nbytes(self):
+        return (sum(sprite.get_nbytes()
+                    for sprite in self.chunksprites.values())
+                + self.elements[2].get_nbytes()
+                + self.animated.get_nbytes())
+
+    def evict_scaled(self, nbytes):
+        # chunks out of view are scaled again if they come back
+        total = self.get_scaled_nbytes()
+        for position, sprite in self.chunksprites.items():
+            if total <= nbytes:
+                break
+            if position not in self.visible_chunks:
+                total -= sprite.get_nbytes()
+                sprite.invalidate()
+
     def button_back(self, window):
         window.set_state('menu')
 
+    def on_resize(self, size: tuple[int, int], window):
+        self.camera.set_size(
+            size, (window.default_width, window.default_height))
+        super().on_resize(size, window)
+        self.update_camera(window)
+
     def on_event(self, event, window):
-        for element in self.elements:
-            element.on_event(event, window)
+        super().on_event(event, window)
 
         if event.type == KEYDOWN:
             do_dir_check = True
@@ -240,62 +350,21 @@ class GameState(State):
             if do_dir_check:
                 self.direction = direction_check
                 self.elements[2].image = PLAYER_DIRECTIONS[self.direction]
-
-    def test_collision(self, dt):
-        x_velocity, y_velocity = self.velocity
-        original_x, original_y = self.position
-        expected_x = original_x + x_velocity * dt
-        expected_y = original_y + y_velocity * dt
-        x_lower, x_upper = ((original_x, expected_x) if x_velocity > 0
-                            else (expected_x, original_x))
-        y_lower, y_upper = ((original_y, expected_y) if y_velocity > 0
-                            else (expected_y, original_y))
-        x_checkpoints = {*()}
-        y_checkpoints = {*()}
-        if x_velocity != 0:
-            for x in frange(pf_ceil(x_lower), pf_floor(x_upper) + 1):
-                x_checkpoints.add((x - original_x) / x_velocity)
-        if y_velocity != 0:
-            for y in frange(pf_ceil(y_lower), pf_floor(y_upper) + 1):
-                y_checkpoints.add((y - original_y) / y_velocity)
-
-        vx_pos = x_velocity > 0
-        vy_pos = y_velocity > 0
-        checkpoints = sorted({*x_checkpoints, *y_checkpoints})
-        for elapsed in checkpoints:
-            current_x = original_x + x_velocity * elapsed
-            current_y = original_y + y_velocity * elapsed
-
-            if x_velocity != 0 and elapsed in x_checkpoints:
-                block_y = current_y - 0.5
-                int_x = floor(current_x) + (1 if vx_pos else -1)
-                for y in range(floor(block_y), ceil(block_y) + 1):
-                    if self.tilemap[int_x, y] in COLLISSION_TILES:
-                        x_velocity = 0
-                        break
-            if y_velocity != 0 and elapsed in y_checkpoints:
-                block_x = current_x - 0.5
-                int_y = floor(current_y) + (1 if vy_pos else -1)
-                for x in range(floor(block_x), ceil(block_x) + 1):
-                    if self.tilemap[x, int_y] in COLLISSION_TILES:
-                        y_velocity = 0
-                        break
-            if x_velocity == 0 and y_velocity == 0:
-                break
-        else:
-            elapsed = dt
-
-        final_x = original_x + x_velocity * elapsed
-        final_y = original_y + y_velocity * elapsed
-        self.position = [final_x, final_y]
+            elif event.key == K_F3:
+                self.elements[3].toggle()
+            elif event.key == K_F4:
+                with open(Path.home().joinpath('spiritual', 'memory.json'),
+                          'w') as file:
+                    MEMORY.dump(file)
 
     def update(self, window, dt):
-        wd_width, wd_height = window.screen.get_size()
-
         for element in self.elements:
             element.update(window, dt)
+        self.receive_chunks()
+        self.update_tiles()
+        self.animation.tick(dt)
 
-        pressed_keys = get_pressed()
+        pressed_keys = window.get_pressed()
         x_dir, y_dir = 0, 0
         if pressed_keys[K_a]:
             x_dir -= 1
@@ -306,68 +375,119 @@ class GameState(State):
         if pressed_keys[K_s]:
             y_dir += 1
 
-        max_velocity = DEFAULT_VELOCITY
-        acceleration = DEFAULT_ACCELERATION
-        vx, vy = self.velocity
-        if x_dir == 0:
-            if abs(vx) < acceleration * dt:
-                vx = 0
-            elif vx > 0:
-                vx -= acceleration * dt
-            else:
-                vx += acceleration * dt
-        else:
-            vx += x_dir * acceleration * dt
-            vx = min(max_velocity, max(-max_velocity, vx))
-        if y_dir == 0:
-            if abs(vy) < acceleration * dt:
-                vy = 0
-            elif vy > 0:
-                vy -= acceleration * dt
-            else:
-                vy += acceleration * dt
-        else:
-            vy += y_dir * acceleration * dt
-            vy = min(max_velocity, max(-max_velocity, vy))
-        self.velocity = [vx, vy]
-        if vx == 0 and vy == 0:
+        self.velocity = accelerate(self.velocity, (x_dir, y_dir), dt)
+        if self.velocity[0] != 0 or self.velocity[1] != 0:
+            self.position = move(self.tilemap, self.position, self.velocity, dt)
+        self.elements[4].player = self.position
+        if self.mobs.count:
+            # every mob follows the shared field towards the player
+            field = self.pathfinder.flow_field_at(self.position)
+            self.mobs.directions[:self.mobs.count] = field.sample(
+                self.mobs.positions[:self.mobs.count])
+        self.mobs.tick(dt)
+        self.update_camera(window)
+
+    def update_camera(self, window):
+        self.camera.set_position(*self.position)
+        if not self.camera.changed:
             return
-        self.test_collision(dt)
-
-        scale = min(wd_width / window.default_width,
-                    wd_height / window.default_height)
-        for pos, sprite in self.chunksprites.items():
-            sprite.set_pos(
-                wd_width * 0.5 + pos[0] * 1024 * scale - self.position[0] * 64 * scale,
-                wd_height * 0.5 + pos[1] * 1024 * scale - self.position[1] * 64 * scale,
-            )
+        self.camera.changed = False
+
+        visible_rect = self.camera.visible_chunks()
+        if visible_rect != self.visible_rect:
+            self.visible_rect = visible_rect
+            x_min, y_min, x_max, y_max = visible_rect
+            visible_chunks = {}
+            for x in range(max(x_min, 0), x_max + 1):
+                for y in range(max(y_min, 0), y_max + 1):
+                    if (x, y) not in self.chunksprites:
+                        continue
+                    if (x, y) not in self.visible_chunks:
+                        self.chunksprites[x, y].on_resize(
+                            (self.camera.width, self.camera.height), window)
+                    visible_chunks[x, y] = self.chunksprites[x, y]
+            self.visible_chunks = visible_chunks
+            self.animated.visible = [*visible_chunks]
+            # the animated cells go over the chunks in the same layer
+            self.elements = (self.elements[:5]
+                             + [*visible_chunks.values(), self.animated])
+            self.priorities = [2, 2, 1, 3, 2] + [0] * (len(visible_chunks)
+                                                       + 1)
+            MEMORY.enforce('scaled')
+
+        for (x, y), chunk_sprite in self.visible_chunks.items():
+            chunk_sprite.set_pos(*self.camera.to_screen(x * 16, y * 16))
 
     def set_location(self, location):
         if location not in TILEMAPS:
             raise ValueError(f'invalid location {location}')
         self.profile.location = location
+        self.achievements.fire(LOCATION_ENTERED, location)
+        TILEMAPS.set_current(location)
         self.tilemap = TILEMAPS[location]
+        self.tilemap.pop_dirty()
+        self.elements[4].set_tilemap(self.tilemap)
+        self.mobs = MobSystem(self.tilemap)
+        self.pathfinder = Pathfinder(self.tilemap)
         width, height = self.tilemap.get_size()
         self.chunksprites = {}
-        # render the chunks as sprites of 16x16 tiles with pygame surfaces
-        for x in range(ceil(width / 16)):
-            for y in range(ceil(height / 16)):
-                chunk = Surface((256, 256), SRCALPHA).convert_alpha()
-                chunk.fill((0, 0, 0, 0))
-                for i in range(min(16, width - x * 16)):
-                    for j in range(min(16, height - y * 16)):
-                        chunk.blit(
-                            TILES[self.tilemap[x * 16 + i, y * 16 + j]],
-                            (i * 16, j * 16),
-                        )
-                self.chunksprites[x, y] = Sprite(
-                    chunk, 400 + x * 1024, 300 + y * 1024,
-                    256, 256, 4, False,
-                )
-        self.elements = self.elements[:3]
-        for chunk_sprite in self.chunksprites.values():
-            self.elements.append(chunk_sprite)
-        self.priorities = [2, 2, 1] + [0] * (len(self.elements) - 3)
+        self.animated.clear()
+        self.late_edits = {}
+        # the chunks bake in the background nearest to the player first,
+        # only the ones in view are waited for
+        self.baker.start(
+            self.tilemap,
+            [(x, y) for x in range(ceil(width / 16))
+             for y in range(ceil(height / 16))],
+            (self.position[0] / 16 - 0.5, self.position[1] / 16 - 0.5))
+        self.camera.set_position(*self.position)
+        x_min, y_min, x_max, y_max = self.camera.visible_chunks()
+        self.baker.wait_for([(x, y) for x in range(x_min, x_max + 1)
+                             for y in range(y_min, y_max + 1)])
+        self.receive_chunks()
+        self.visible_chunks = {}
+        self.visible_rect = None
+        self.camera.changed = True
+        self.elements = self.elements[:5]
+        self.priorities = [2, 2, 1, 3, 2]
+
+    def receive_chunks(self):
+        received = False
+        for (x, y), (image, animated) in self.baker.poll():
+            # render the chunks as sprites of 16x16 tiles
+            self.chunksprites[x, y] = Sprite(
+                image, 400 + x * 1024, 300 + y * 1024, 256, 256, 4, False,
+            )
+            for cell in animated:
+                self.animated.set_tile(*cell)
+            for cell in self.late_edits.pop((x, y), ()):
+                self.update_tile(*cell)
+            received = True
+        if received:
+            # update_camera picks the new chunks up
+            self.visible_rect = None
+            self.camera.changed = True
+
+    def update_tiles(self):
+        # re-blit only the cells edited since the last frame
+        for x, y in self.tilemap.pop_dirty():
+            self.elements[4].set_tile(x, y, self.tilemap[x, y])
+            if (x // 16, y // 16) in self.chunksprites:
+                self.update_tile(x, y)
+            else:
+                # the bake may have read the tile before the edit
+                self.late_edits.setdefault((x // 16, y // 16), set()).add(
+                    (x, y))
+
+    def update_tile(self, x, y):
+        chunk_sprite = self.chunksprites[x // 16, y // 16]
+        tile = self.tilemap[x, y]
+        self.animated.set_tile(x, y, tile)
+        cell = ((x % 16) * 16, (y % 16) * 16, 16, 16)
+        chunk_sprite.image.fill((0, 0, 0, 0), cell)
+        if tile not in TILE_ANIMATIONS:
+            chunk_sprite.image.blit(TILES[tile], cell[:2])
+        chunk_sprite.update_region(cell)
 
 
 STATES = {
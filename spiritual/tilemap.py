@@ -2,14 +2,44 @@ from pygame.constants import SRCALPHA
 from pygame.image import load as load_image
 from pygame.surface import Surface
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sys import getsizeof
+from threading import Lock
+
+import numpy as np
+
+from .constant import TILEMAP_MEMORY_BUDGET
+from .mapfile import MapFile, write as write_mapfile
+from .memory import MEMORY, surface_nbytes
 from .smartdata import SmartData
 
 __all__ = [
-    'TILEMAP_IDS', 'TILEMAPS',
-    'TILE_IDS', 'COLLISSION_TILES', 'TILES',
+    'Tilemap', 'convert_tilemap', 'LocationRegistry', 'TileImages',
+    'TileFrames', 'TILEMAP_IDS', 'TILEMAP_CONNECTIONS', 'TILEMAPS',
+    'TILE_IDS', 'COLLISSION_TILES', 'TILE_ANIMATIONS', 'TILES',
+    'TILE_FRAMES',
 ]
 
 
+TILE_IDS = (
+    'empty',
+    'grass',
+    'water',
+)
+
+COLLISSION_TILES = (
+    'empty',
+    'water',
+)
+
+# tile: (frame count, seconds per frame); the image of an animated tile is
+# a horizontal strip of 16x16 frames
+TILE_ANIMATIONS = {
+    'water': (4, 0.25),
+}
+
+
 class TilemapData(SmartData):
     boolmaps: dict[str, list[list[int]]]
     sources: dict[str, str]
@@ -23,9 +53,72 @@ class Tilemap(SmartData):
     tilemap: list[list[str]]
     sources: dict[str, str]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collisions = [
+            bytearray(tile in COLLISSION_TILES for tile in column)
+            for column in self.tilemap
+        ]
+        self.dirty = {*()}
+        self.modified = False
+        self.version = 0
+        self.mask = None
+        self.mask_version = None
+
     def get_size(self):
         return (len(self.tilemap), len(self.tilemap[0]))
 
+    def in_bounds(self, x, y):
+        return 0 <= x < len(self.tilemap) and 0 <= y < len(self.tilemap[0])
+
+    def collides(self, x, y):
+        if not self.in_bounds(x, y):
+            return 'empty' in COLLISSION_TILES
+        return self.collisions[x][y]
+
+    def get_mask(self):
+        # boolean collision array, rebuilt after edits
+        if self.mask_version != self.version:
+            width, height = self.get_size()
+            self.mask = np.frombuffer(
+                b''.join(self.collisions), np.uint8,
+            ).reshape(width, height).astype(bool)
+            self.mask_version = self.version
+        return self.mask
+
+    def set_tile(self, x, y, tile):
+        if tile not in TILE_IDS:
+            raise ValueError(f'invalid tile {tile}')
+        if not self.in_bounds(x, y):
+            raise IndexError(f'tile position {(x, y)} out of range')
+        if self.tilemap[x][y] == tile:
+            return
+        self.tilemap[x][y] = tile
+        self.collisions[x][y] = tile in COLLISSION_TILES
+        self.dirty.add((x, y))
+        self.modified = True
+        self.version += 1
+
+    def fill(self, x, y, width, height, tile):
+        if tile not in TILE_IDS:
+            raise ValueError(f'invalid tile {tile}')
+        map_width, map_height = self.get_size()
+        for i in range(max(x, 0), min(x + width, map_width)):
+            for j in range(max(y, 0), min(y + height, map_height)):
+                self.set_tile(i, j, tile)
+
+    def pop_dirty(self):
+        dirty = self.dirty
+        self.dirty = {*()}
+        return dirty
+
+    def get_nbytes(self):
+        # the tile strings are shared, so only the grid itself is counted
+        return (getsizeof(self.tilemap)
+                + sum(getsizeof(column) for column in self.tilemap)
+                + getsizeof(self.collisions)
+                + sum(getsizeof(column) for column in self.collisions))
+
     def __getitem__(self, key):
         if not isinstance(key, tuple):
             raise TypeError('Tilemap indices must be tuples')
@@ -53,16 +146,165 @@ class Tilemap(SmartData):
                         break
         return cls(tilemap, data.sources)
 
+    @classmethod
+    def loadfile(cls, file):
+        mapfile = MapFile(file)
+        return cls(mapfile.read_grid(), mapfile.sources)
+
+    def dumpfile(self, file, chunk_size=16):
+        write_mapfile(file, self.tilemap, self.sources, chunk_size)
+
+
+def convert_tilemap(source, target, chunk_size=16):
+    with open(source) as file:
+        tilemap = Tilemap.loaddata(TilemapData.load_stream(file))
+    with open(target, 'wb') as file:
+        tilemap.dumpfile(file, chunk_size)
+
+
+class LocationRegistry:
+    def __init__(self, ids, connections, budget):
+        self.ids = ids
+        self.connections = connections
+        self.budget = budget
+        self.current = None
+        self.loaded = OrderedDict()
+        self.nbytes = {}
+        self.pending = {}
+        self.lock = Lock()
+        self.executor = None
+
+    def __contains__(self, location):
+        return location in self.ids
+
+    def __getitem__(self, location):
+        if location not in self.ids:
+            raise KeyError(location)
+        with self.lock:
+            tilemap = self.loaded.get(location)
+            future = self.pending.get(location)
+        if tilemap is None:
+            try:
+                tilemap = future.result() if future is not None else None
+            except Exception:
+                # a failed prefetch is retried here, raising the real error
+                tilemap = None
+            if tilemap is None:
+                tilemap = self.load(location)
+        tilemap = self.store(location, tilemap)
+        self.prefetch(location)
+        return tilemap
+
+    def set_current(self, location):
+        # the map the player is in is never evicted
+        with self.lock:
+            self.current = location
+
+    def load(self, location):
+        with open(f'assets/{location}.map', 'rb') as file:
+            return Tilemap.loadfile(file)
+
+    def store(self, location, tilemap):
+        with self.lock:
+            self.pending.pop(location, None)
+            tilemap = self.loaded.setdefault(location, tilemap)
+            self.loaded.move_to_end(location)
+            if location not in self.nbytes:
+                self.nbytes[location] = tilemap.get_nbytes()
+            self.shrink(self.budget)
+        return tilemap
+
+    def prefetch(self, location):
+        with self.lock:
+            for neighbor in self.connections.get(location, ()):
+                if neighbor in self.loaded or neighbor in self.pending:
+                    continue
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        1, thread_name_prefix='prefetch')
+                self.pending[neighbor] = self.executor.submit(
+                    self.prefetch_one, neighbor)
+
+    def prefetch_one(self, location):
+        try:
+            tilemap = self.load(location)
+        except Exception:
+            # dropped so that later accesses load it again
+            with self.lock:
+                self.pending.pop(location, None)
+            raise
+        return self.store(location, tilemap)
+
+    def get_nbytes(self):
+        with self.lock:
+            return sum(self.nbytes.values())
+
+    def set_budget(self, budget):
+        # None lifts the budget
+        with self.lock:
+            self.budget = budget
+            self.shrink(budget)
+
+    def evict(self, nbytes):
+        with self.lock:
+            self.shrink(nbytes)
+
+    def shrink(self, nbytes):
+        # least recently used first; the current and edited maps stay
+        if nbytes is None:
+            return
+        total = sum(self.nbytes.values())
+        for location in [*self.loaded]:
+            if total <= nbytes:
+                break
+            if location == self.current or self.loaded[location].modified:
+                continue
+            del self.loaded[location]
+            total -= self.nbytes.pop(location)
+
+
+class TileImages(dict):
+    def __missing__(self, tile):
+        if tile not in TILE_IDS:
+            raise KeyError(tile)
+        if tile == 'empty':
+            image = Surface((16, 16), SRCALPHA)
+        elif tile in TILE_ANIMATIONS:
+            image = TILE_FRAMES[tile][0]
+        else:
+            image = load_image(f'assets/{tile}.png')
+        self[tile] = image
+        return image
+
+    def get_nbytes(self):
+        return sum(surface_nbytes(image) for image in self.values())
+
+
+class TileFrames(dict):
+    def __missing__(self, tile):
+        count, _ = TILE_ANIMATIONS[tile]
+        strip = load_image(f'assets/{tile}.png')
+        frames = [strip.subsurface((i * 16, 0, 16, 16)) for i in range(count)]
+        self[tile] = frames
+        return frames
+
+    def get_nbytes(self):
+        return sum(surface_nbytes(frames[0].get_parent())
+                   for frames in self.values())
+
 
 TILEMAP_IDS = (
     'spawn',
 )
 
-TILEMAPS = {}
-for _id in TILEMAP_IDS:
-    with open(f'assets/{_id}.json', 'r') as file:
-        TILEMAPS[_id] = Tilemap.loaddata(TilemapData.load(file))
-        # TILEMAPS[_id] = Tilemap.load(pickle_load(file))
+TILEMAP_CONNECTIONS = {
+    'spawn': (),
+}
+
+TILEMAPS = LocationRegistry(
+    TILEMAP_IDS, TILEMAP_CONNECTIONS, TILEMAP_MEMORY_BUDGET)
+MEMORY.register('tilemaps', 'locations', TILEMAPS.get_nbytes,
+                TILEMAPS.evict, TILEMAPS.set_budget)
 
 
 # obj = TilemapData(
@@ -94,18 +336,7 @@ for _id in TILEMAP_IDS:
 #     print(tilemap.tilemap)
 
 
-TILE_IDS = (
-    'empty',
-    'grass',
-)
-
-COLLISSION_TILES = (
-    'empty',
-)
-
-TILES = {}
-for _id in TILE_IDS:
-    if _id == 'empty':
-        TILES[_id] = Surface((16, 16), SRCALPHA)
-    else:
-        TILES[_id] = load_image(f'assets/{_id}.png')
+TILES = TileImages()
+TILE_FRAMES = TileFrames()
+MEMORY.register('tile_images', 'tiles', TILES.get_nbytes)
+MEMORY.register('tile_images', 'frames', TILE_FRAMES.get_nbytes)
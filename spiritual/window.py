@@ -1,12 +1,15 @@
 from pygame.constants import QUIT, RESIZABLE, SRCALPHA, VIDEORESIZE
 from pygame.display import set_caption, set_mode, flip
 from pygame.event import get as get_events
+from pygame.key import get_pressed
 from pygame.surface import Surface
 from pygame.time import Clock
 
 from pathlib import Path
 
 from .profile import Profile
+from .render import RenderQueue
+from .replay import Recorder
 from .state import STATES, State
 
 __all__ = ['SpiritualWindow']
@@ -14,45 +17,62 @@ __all__ = ['SpiritualWindow']
 
 class SpiritualWindow:
     screen: Surface
-    state: State
+    queue: RenderQueue
+    state: State | None = None
     state_name: str
     profile_path: Path | None = None
     profile: Profile | None = None
+    recorder: Recorder | None = None
+    keys = None
 
     default_width: int = 800
     default_height: int = 600
 
-    def __init__(self, window_size=(800, 600)):
+    def __init__(self, window_size=(800, 600), record=None):
+        self.pending_size = None
         self.screen = set_mode(window_size, RESIZABLE | SRCALPHA)
         set_caption('Spiritual')
+        self.queue = RenderQueue(window_size)
+        if record is not None:
+            self.recorder = Recorder(record, window_size)
         self.set_state('menu')
 
+    def get_pressed(self):
+        # replays and recordings substitute the keyboard state
+        return get_pressed() if self.keys is None else self.keys
+
     def on_event(self, event):
         if event.type == QUIT:
             self.running = False
         elif event.type == VIDEORESIZE:
-            self.state.on_resize(event.size, self)
+            # applied once per frame, a drag sends a burst of these
+            self.pending_size = event.size
         else:
             self.state.on_event(event, self)
 
+    def apply_resize(self):
+        if self.pending_size is not None:
+            self.state.on_resize(self.pending_size, self)
+            self.pending_size = None
+
     def draw(self):
         self.screen.fill((92, 92, 92, 255))
-        prio_map = {}
+        self.queue.size = self.screen.get_size()
         if len(self.state.elements) != len(self.state.priorities):
             # print('WARNING: Element count does not match priority count!')
+            self.queue.set_priority(0)
             for element in self.state.elements:
-                element.draw(self.screen)
+                element.draw(self.queue)
         else:
             for element, prio in zip(self.state.elements, self.state.priorities):
-                if prio not in prio_map:
-                    prio_map[prio] = []
-                prio_map[prio].append(element)
-            for prio in sorted(prio_map):
-                for element in prio_map[prio]:
-                    element.draw(self.screen)
+                self.queue.set_priority(prio)
+                element.draw(self.queue)
+        self.queue.present(self.screen)
         flip()
 
     def set_state(self, state_name):
+        if self.state is not None:
+            self.state.leave(self)
         self.state_name = state_name
         self.state = STATES[state_name]()
         self.state.on_resize(self.screen.get_size(), self)
@@ -67,8 +87,21 @@ class SpiritualWindow:
         self.running = True
         clock = Clock()
         while self.running:
-            for event in get_events():
+            events = get_events()
+            for event in events:
                 self.on_event(event)
+            self.apply_resize()
             self.draw()
             dt = clock.tick(60) / 1000
+            if self.recorder is not None:
+                self.keys = self.recorder.record_frame(events, dt)
             self.update(dt)
+        if self.recorder is not None:
+            self.recorder.close(self)
+        self.close()
+
+    def close(self):
+        # states may hold threads, the game bakes chunks on a pool
+        if self.state is not None:
+            self.state.leave(self)
+            self.state = None